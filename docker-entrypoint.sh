@@ -0,0 +1,15 @@
+#!/bin/sh
+set -e
+
+# Apply migrations only when some are pending, so a regular restart skips migrate entirely.
+if ! python manage.py migrate --check > /dev/null 2>&1; then
+    python manage.py migrate --noinput
+fi
+
+# Metrics of the previous run's worker processes must not be aggregated with the new ones.
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
+exec "$@"
@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration for the production start mode.
+
+The application is imported and warmed up once in the master process before the socket is bound,
+and the workers are forked from it. Every worker logs how long its first request took.
+Workers serve requests from several threads, so that concurrent identical task list requests
+hitting the same worker are coalesced into one.
+With PROMETHEUS_MULTIPROC_DIR set, the workers write their metrics to that directory
+and /metrics aggregates them.
+"""
+import multiprocessing
+import os
+import threading
+import time
+
+wsgi_app = "task_manager.wsgi:application"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+preload_app = True
+accesslog = "-"
+
+
+def on_starting(server):
+    from projects.warmup import warm_up
+
+    start = time.perf_counter()
+    timings = warm_up()
+    steps = ", ".join(f"{step} {duration * 1000:.1f} ms" for step, duration in timings.items())
+    server.log.info("Warm-up finished in %.1f ms (%s)", (time.perf_counter() - start) * 1000, steps)
+
+
+def post_worker_init(worker):
+    worker.first_request_seen = False
+    worker.first_request_lock = threading.Lock()
+
+
+def pre_request(worker, req):
+    # The worker's threads share it: only the request that claims the flag carries a start time,
+    # so a concurrent request that finishes earlier isn't logged as the first one.
+    with worker.first_request_lock:
+        if worker.first_request_seen:
+            return
+        worker.first_request_seen = True
+    req.first_request_start = time.perf_counter()
+
+
+def post_request(worker, req, environ, resp):
+    start = getattr(req, "first_request_start", None)
+    if start is not None:
+        duration = (time.perf_counter() - start) * 1000
+        worker.log.info("First request of worker %s: %s %s took %.1f ms", worker.pid, req.method, req.path, duration)
+
+
+def child_exit(server, worker):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,6 +1,114 @@
 from django.contrib import admin
-from .models import Project, Task
-# Register your models here.
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils.functional import cached_property
+from . import dependencies
+from .changes import record_tasks
+from .estimates import estimate_count
+from .models import Change, Project, Task
 
-admin.site.register(Project)
-admin.site.register(Task)
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the planner's row estimate instead of COUNT(*) for unfiltered large tables.
+
+    Filtered changelists and small tables are still counted exactly.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model)
+            if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class OwnerFilter(admin.SimpleListFilter):
+    """
+    Filters tasks by the username of the project owner entered in a text box.
+
+    Unlike a related field filter it doesn't render a choice for every user.
+    """
+    title = "project owner"
+    parameter_name = "owner"
+    template = "admin/input_filter.html"
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice["query_parts"] = [
+            (key, value)
+            for key, values in changelist.get_filters_params().items() if key != self.parameter_name
+            for value in values
+        ]
+        yield all_choice
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(project__user__username=self.value())
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Base admin for tables with millions of rows.
+
+    Avoids exact counts of the whole table and per-choice facet counts.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+@admin.register(Project)
+class ProjectAdmin(LargeTableAdmin):
+    list_display = ["id", "name", "user"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+    search_fields = ["name"]
+    ordering = ["-id"]
+
+
+@admin.register(Task)
+class TaskAdmin(LargeTableAdmin):
+    list_display = ["id", "name", "project", "priority", "status", "deadline"]
+    list_select_related = ["project"]
+    list_filter = ["status", "deadline", OwnerFilter]
+    autocomplete_fields = ["project"]
+    # Maintained by the dependency links, see projects.dependencies.
+    readonly_fields = ["topo_order", "unmet_dependencies"]
+    search_fields = ["name"]
+    ordering = ["-id"]
+    actions = ["mark_done", "mark_not_done"]
+
+    def get_readonly_fields(self, request, obj=None):
+        # Dependency links, the topological position and the counter only hold within one project.
+        if obj is not None:
+            return [*self.readonly_fields, "project"]
+        return self.readonly_fields
+
+    def update_status(self, request, queryset, status: bool) -> None:
+        """
+        Sets the status of the selected tasks with a single UPDATE and records it in the change log.
+        The unmet dependency counters of the tasks waiting for them are updated with one more UPDATE.
+        """
+        with transaction.atomic():
+            record_tasks(queryset, Change.UPDATE, status=status)
+            updated = dependencies.update_status(queryset, status)
+        self.message_user(request, f"{updated} tasks updated.")
+
+    @admin.action(description="Mark selected tasks as done")
+    def mark_done(self, request, queryset):
+        self.update_status(request, queryset, True)
+
+    @admin.action(description="Mark selected tasks as not done")
+    def mark_not_done(self, request, queryset):
+        self.update_status(request, queryset, False)
@@ -0,0 +1,218 @@
+from itertools import islice
+from django.db import transaction
+from django.db.models import F, Max
+from .models import Change, ChangeCompaction, Project, Task, TaskDependency
+
+FEED_PAGE_SIZE = 500
+
+
+def project_data(project: Project) -> dict:
+    """
+    Builds the compact state of a project stored in the change log.
+
+    Args:
+    project (Project): The project to describe.
+
+    Returns:
+    dict: Project fields the clients render.
+    """
+    return {"name": project.name}
+
+
+def task_data(task: Task) -> dict:
+    """
+    Builds the compact state of a task stored in the change log.
+
+    Args:
+    task (Task): The task to describe.
+
+    Returns:
+    dict: Task fields the clients render.
+    """
+    return {
+        "project": task.project_id,
+        "name": task.name,
+        "priority": task.priority,
+        "status": task.status,
+        "deadline": task.deadline.isoformat() if task.deadline else None,
+        "unmet_dependencies": task.unmet_dependencies,
+    }
+
+
+def lock_change_log(user_id: int) -> None:
+    """
+    Locks the user's change log until the end of the current transaction.
+
+    Change IDs are taken when the entry is inserted, but transactions commit in their own order.
+    Holding the lock from the first recorded entry until the commit makes the user's writers commit
+    in ID order, so a client never receives a cursor past an entry that isn't visible yet.
+    The compaction row of the user serves as the lock and is created on first use.
+
+    Args:
+    user_id (int): Owner of the change log.
+    """
+    locked = ChangeCompaction.objects.select_for_update().filter(user_id=user_id).values_list("pk", flat=True)
+    if not locked:
+        ChangeCompaction.objects.get_or_create(user_id=user_id)
+        list(locked.all())
+
+
+def record_project(project: Project, action: str) -> Change:
+    """
+    Appends a project change to the owner's change log.
+
+    Args:
+    project (Project): The changed project.
+    action (str): Kind of the change.
+
+    Returns:
+    Change: The recorded entry.
+    """
+    data = {} if action == Change.DELETE else project_data(project)
+    with transaction.atomic():
+        lock_change_log(project.user_id)
+        return Change.objects.create(
+            user_id=project.user_id, model="project", object_id=project.pk, action=action, data=data
+        )
+
+
+def record_task(task: Task, action: str, user_id: int | None = None) -> Change:
+    """
+    Appends a task change to the project owner's change log.
+
+    Args:
+    task (Task): The changed task.
+    action (str): Kind of the change.
+    user_id (int): Owner of the project, looked up through the task when omitted.
+
+    Returns:
+    Change: The recorded entry.
+    """
+    if user_id is None:
+        user_id = task.project.user_id
+    if action == Change.DELETE:
+        data = {"project": task.project_id}
+    elif action == Change.REORDER:
+        data = {"project": task.project_id, "priority": task.priority}
+    else:
+        data = task_data(task)
+    with transaction.atomic():
+        lock_change_log(user_id)
+        return Change.objects.create(user_id=user_id, model="task", object_id=task.pk, action=action, data=data)
+
+
+def record_dependency(link: TaskDependency, action: str, user_id: int | None = None) -> Change:
+    """
+    Appends an added or removed dependency link to the project owner's change log.
+
+    Args:
+    link (TaskDependency): The changed link.
+    action (str): Kind of the change, create or delete.
+    user_id (int): Owner of the project, looked up through the waiting task when omitted.
+
+    Returns:
+    Change: The recorded entry.
+    """
+    if user_id is None:
+        user_id = link.task.project.user_id
+    data = {"project": link.task.project_id, "task": link.task_id, "depends_on": link.depends_on_id}
+    with transaction.atomic():
+        lock_change_log(user_id)
+        return Change.objects.create(user_id=user_id, model="dependency", object_id=link.pk, action=action, data=data)
+
+
+def record_tasks(queryset, action: str, batch_size: int = 1000, **values) -> None:
+    """
+    Appends changes for every task of the queryset with batched inserts.
+
+    Used by set-based writes such as queryset updates, which do not send model signals.
+    Call it before the update, in the same transaction, so that the tasks are still matched
+    by the queryset's filters and the change logs stay locked until the update commits.
+
+    Args:
+    queryset (QuerySet): The tasks to be changed.
+    action (str): Kind of the change.
+    batch_size (int): Number of tasks read and recorded per query.
+    values: Field values the update is going to set.
+    """
+    rows = queryset.order_by().values(
+        "id", "project_id", "name", "priority", "status", "deadline", "unmet_dependencies",
+        user_id=F("project__user_id")
+    ).iterator(chunk_size=batch_size)
+    locked = set()
+    while batch := list(islice(rows, batch_size)):
+        changes = []
+        for user_id in sorted({row["user_id"] for row in batch} - locked):
+            lock_change_log(user_id)
+            locked.add(user_id)
+        for row in batch:
+            user_id = row.pop("user_id")
+            task = Task(**{**row, **values})
+            changes.append(Change(user_id=user_id, model="task", object_id=task.pk, action=action,
+                                  data=task_data(task)))
+        Change.objects.bulk_create(changes)
+
+
+def head_cursor(user) -> int:
+    """
+    Returns the cursor pointing after the newest change of the user.
+
+    Args:
+    user (User): Owner of the change log.
+
+    Returns:
+    int: ID of the newest change, or the compaction point if the log is empty.
+    """
+    last_id = Change.objects.filter(user=user).aggregate(Max("id"))["id__max"]
+    if last_id is None:
+        last_id = ChangeCompaction.objects.filter(user=user).values_list("last_id", flat=True).first() or 0
+    return last_id
+
+
+def changes_since(user, cursor: int, limit: int = FEED_PAGE_SIZE) -> dict | None:
+    """
+    Collects the user's changes recorded after the given cursor.
+
+    Several changes of the same object are collapsed into the latest one,
+    so the response only carries the final state of every touched object.
+    The compaction point is read after the entries: if a compaction removed entries
+    after the cursor before they were read, the client is told to resync instead of skipping them.
+
+    Args:
+    user (User): Owner of the change log.
+    cursor (int): ID of the last change the client has applied.
+    limit (int): Maximum number of log entries to read.
+
+    Returns:
+    dict: The new cursor, the collapsed changes and whether more entries are pending.
+    None: The cursor is older than the compacted part of the log and the client must resync.
+    """
+    entries = list(
+        Change.objects.filter(user=user, id__gt=cursor)
+        .order_by("id")
+        .values("id", "model", "object_id", "action", "data")[:limit + 1]
+    )
+    compacted = ChangeCompaction.objects.filter(user=user).values_list("last_id", flat=True).first() or 0
+    if cursor < compacted:
+        return None
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for entry in entries:
+        key = (entry["model"], entry["object_id"])
+        previous = latest.pop(key, None)
+        if previous is not None and entry["action"] != Change.DELETE:
+            if previous["action"] == Change.CREATE or entry["action"] == Change.REORDER:
+                entry["action"] = previous["action"]
+            entry["data"] = {**previous["data"], **entry["data"]}
+        latest[key] = entry
+
+    return {
+        "cursor": entries[-1]["id"] if entries else cursor,
+        "has_more": has_more,
+        "changes": [
+            {"model": e["model"], "id": e["object_id"], "action": e["action"], "data": e["data"]}
+            for e in latest.values()
+        ],
+    }
@@ -0,0 +1,95 @@
+import threading
+from functools import wraps
+from django.http import HttpResponse
+
+
+class Flight:
+    """
+    A call in progress and its result, shared by the requests waiting for it.
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time within the process.
+
+    Callers that arrive while a call with the same key is in progress wait for it
+    and receive its result instead of running the call again.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def do(self, key, function):
+        """
+        Runs the function, or waits for the running call with the same key.
+
+        If the running call fails, the waiting callers run the function themselves.
+
+        Args:
+        key (Hashable): Identity of the call.
+        function (Callable): The call to run.
+
+        Returns:
+        Any: Result of the function.
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+        if not leader:
+            flight.done.wait()
+            return function() if flight.failed else flight.result
+
+        try:
+            flight.result = function()
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.result
+
+
+def coalesce_get(version):
+    """
+    Decorator that shares the response of concurrent identical GET requests of the same user.
+
+    Only one of them runs the view, the others receive a copy of its response.
+    Requests are identical when they have the same user, full path and data version.
+    The version is read when a request arrives, so a request never joins a render
+    that started before a write it depends on was committed.
+
+    Args:
+    version (Callable): Returns the current version of the data the response is built from
+    for a request, e.g. the head of the user's change log.
+    """
+    def decorator(view):
+        flights = SingleFlight()
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return view(request, *args, **kwargs)
+
+            def call():
+                response = view(request, *args, **kwargs)
+                return response.status_code, response.content, list(response.items())
+
+            key = (request.user.pk, request.get_full_path(), version(request))
+            status, content, headers = flights.do(key, call)
+            response = HttpResponse(content, status=status)
+            for header, value in headers:
+                response[header] = value
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,217 @@
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery
+from .changes import record_dependency, record_tasks
+from .models import Change, Task, TaskDependency
+
+REORDER_BATCH_SIZE = 1000
+
+
+def reachable(start: int, neighbours: str, bound: int) -> dict[int, int]:
+    """
+    Collects the tasks reachable from a task through dependency links, in one recursive query.
+
+    The search doesn't continue past a task positioned beyond the bound,
+    so only the part of the project between two positions is visited.
+
+    Args:
+    start (int): ID of the task to start from.
+    neighbours (str): "dependents" to follow links to the tasks waiting for a task (positioned at most at the bound),
+    "prerequisites" to follow links to the tasks a task waits for (positioned at least at the bound).
+    bound (int): Topological position a reached task must not pass.
+
+    Returns:
+    dict[int, int]: Topological position of every reached task by ID, the start task excluded.
+    """
+    if neighbours == "dependents":
+        source, target, operator = "depends_on_id", "task_id", "<="
+    else:
+        source, target, operator = "task_id", "depends_on_id", ">="
+    links = connection.ops.quote_name(TaskDependency._meta.db_table)
+    tasks = connection.ops.quote_name(Task._meta.db_table)
+    sql = f"""
+        WITH RECURSIVE reached (id, topo_order) AS (
+            SELECT task.id, task.topo_order
+            FROM {links} link JOIN {tasks} task ON task.id = link.{target}
+            WHERE link.{source} = %s AND task.topo_order {operator} %s
+            UNION
+            SELECT task.id, task.topo_order
+            FROM reached
+            JOIN {links} link ON link.{source} = reached.id
+            JOIN {tasks} task ON task.id = link.{target}
+            WHERE task.topo_order {operator} %s
+        )
+        SELECT id, topo_order FROM reached
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [start, bound, bound])
+        return dict(cursor.fetchall())
+
+
+def reorder(task: Task, prerequisite: Task) -> None:
+    """
+    Restores the topological order before the prerequisite -> task link is added.
+
+    Only the tasks between the two positions are visited (Pearce and Kelly, 2006):
+    the tasks that transitively wait for the task and the tasks the prerequisite transitively waits for.
+    Their positions are pooled and handed out again, the prerequisite's side first.
+    Positions are internal and not part of the change log.
+
+    Args:
+    task (Task): The task that will wait, currently not after the prerequisite.
+    prerequisite (Task): The task that has to be completed first.
+
+    Raises:
+    ValidationError: The prerequisite already waits for the task, so the link would create a cycle.
+    """
+    lower, upper = task.topo_order, prerequisite.topo_order
+    forward = reachable(task.id, "dependents", upper)
+    if prerequisite.id in forward:
+        raise ValidationError("The task is already a prerequisite of this task.", code="cycle")
+    forward[task.id] = lower
+    backward = reachable(prerequisite.id, "prerequisites", lower)
+    backward[prerequisite.id] = upper
+
+    affected = sorted(backward, key=backward.get) + sorted(forward, key=forward.get)
+    positions = sorted([*backward.values(), *forward.values()])
+    tasks = [Task(id=task_id, topo_order=position) for task_id, position in zip(affected, positions)]
+    Task.objects.bulk_update(tasks, ["topo_order"], batch_size=REORDER_BATCH_SIZE)
+    task.topo_order = positions[affected.index(task.id)]
+    prerequisite.topo_order = positions[affected.index(prerequisite.id)]
+
+
+def lock_status(task: Task) -> bool:
+    """
+    Locks a task's row until the end of the transaction and returns its current status.
+
+    Task.save takes the same lock before a status change, so the status can't change
+    between this read and the counter update that depends on it.
+
+    Args:
+    task (Task): The task to lock.
+
+    Returns:
+    bool: The committed status of the task.
+    """
+    task.status = Task.objects.select_for_update().filter(pk=task.pk).values_list("status", flat=True).get()
+    return task.status
+
+
+def add_dependency(task: Task, prerequisite: Task) -> TaskDependency:
+    """
+    Makes a task wait until another task of the same project is completed.
+
+    The caller is expected to hold the project lock, so that concurrent links can't form a cycle.
+    The prerequisite's row is locked before anything is written, so completing it concurrently
+    (e.g. in the admin, which doesn't take the project lock) waits for the link, or the link sees it completed.
+    The link and the task's new counter are recorded in the change log.
+
+    Args:
+    task (Task): The task that will wait.
+    prerequisite (Task): The task that has to be completed first.
+
+    Returns:
+    TaskDependency: The created link.
+
+    Raises:
+    ValidationError: The tasks belong to different projects, are the same task,
+    are already linked, or the link would create a cycle.
+    """
+    if task.project_id != prerequisite.project_id:
+        raise ValidationError("Select a task of the same project.", code="project")
+    if task.id == prerequisite.id:
+        raise ValidationError("A task can't depend on itself.", code="self")
+    if TaskDependency.objects.filter(task=task, depends_on=prerequisite).exists():
+        raise ValidationError("The task already depends on this task.", code="duplicate")
+    with transaction.atomic():
+        completed = lock_status(prerequisite)
+        if prerequisite.topo_order >= task.topo_order:
+            reorder(task, prerequisite)
+        link = TaskDependency.objects.create(task=task, depends_on=prerequisite)
+        record_dependency(link, Change.CREATE)
+        if not completed:
+            waiting = Task.objects.filter(pk=task.pk)
+            waiting.update(unmet_dependencies=F("unmet_dependencies") + 1)
+            record_tasks(waiting, Change.UPDATE)
+    return link
+
+
+def remove_dependency(task: Task, prerequisite: Task) -> bool:
+    """
+    Removes the link between a task and its prerequisite.
+
+    Removing a link keeps the topological order valid, so no task is moved.
+    The prerequisite's row is locked like in add_dependency.
+    The removal and the task's new counter are recorded in the change log.
+
+    Args:
+    task (Task): The waiting task.
+    prerequisite (Task): The task it waits for.
+
+    Returns:
+    bool: True if the link existed.
+    """
+    with transaction.atomic():
+        completed = lock_status(prerequisite)
+        link = TaskDependency.objects.filter(task=task, depends_on=prerequisite).first()
+        if link is None:
+            return False
+        link.task = task
+        record_dependency(link, Change.DELETE)
+        link.delete()
+        if not completed:
+            waiting = Task.objects.filter(pk=task.pk)
+            waiting.update(unmet_dependencies=F("unmet_dependencies") - 1)
+            record_tasks(waiting, Change.UPDATE)
+    return True
+
+
+def update_unmet_dependencies(prerequisites, completed: bool) -> None:
+    """
+    Updates the counters of the tasks waiting for prerequisites that were completed or reopened.
+
+    Each waiting task is adjusted by the number of its links to the prerequisites, with a single UPDATE,
+    and its new counter is recorded in the change log.
+
+    Args:
+    prerequisites (QuerySet | list[int]): IDs of the prerequisites whose status changes.
+    completed (bool): True if they were completed (or deleted while open), False if they were reopened.
+    """
+    links = TaskDependency.objects.filter(task=OuterRef("pk"), depends_on__in=prerequisites)
+    count = Subquery(links.order_by().values("task").annotate(count=Count("pk")).values("count"))
+    waiting = Task.objects.filter(pk__in=TaskDependency.objects.filter(depends_on__in=prerequisites).values("task_id"))
+    waiting.update(unmet_dependencies=F("unmet_dependencies") - count if completed else F("unmet_dependencies") + count)
+    record_tasks(waiting, Change.UPDATE)
+
+
+def update_status(queryset: QuerySet, status: bool) -> int:
+    """
+    Sets the status of many tasks and updates the counters of the tasks waiting for them.
+
+    The selected rows are locked in ID order first, the same lock Task.save takes,
+    so a concurrent status change of one of them can't adjust the same counters twice.
+
+    Args:
+    queryset (QuerySet): Tasks to update.
+    status (bool): The new status.
+
+    Returns:
+    int: Number of tasks matched by the queryset.
+    """
+    with transaction.atomic():
+        rows = list(queryset.select_for_update(of=("self",)).order_by("pk").values_list("pk", "status"))
+        update_unmet_dependencies([pk for pk, current in rows if current != status], status)
+        return Task.objects.filter(pk__in=[pk for pk, _ in rows]).update(status=status)
+
+
+def ready_tasks(project) -> QuerySet:
+    """
+    Returns the not completed tasks of a project whose prerequisites are all completed.
+
+    Args:
+    project (Project): The project.
+
+    Returns:
+    QuerySet: Ready tasks in priority order.
+    """
+    return Task.objects.filter(project=project, status=False, unmet_dependencies=0)
@@ -0,0 +1,25 @@
+from django.db import connection
+
+
+def estimate_count(model) -> int | None:
+    """
+    Returns the planner's estimate of the number of rows in the model's table.
+
+    The estimate is read from the PostgreSQL catalog and costs no table scan.
+    It is refreshed by autovacuum/ANALYZE and may lag behind the exact number.
+
+    Args:
+    model (Model): The model whose table is estimated.
+
+    Returns:
+    int: Estimated number of rows.
+    None: The database does not provide estimates or the table was never analyzed.
+    """
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
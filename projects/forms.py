@@ -1,5 +1,5 @@
 from django import forms
-from .models import Project, Task
+from .models import Project, Task, TaskDependency
 
 
 class ProjectForm(forms.ModelForm):
@@ -31,3 +31,22 @@ class TaskForm(forms.ModelForm):
     class Meta:
         model = Task
         fields = ["name", "deadline"]
+
+
+class TaskDependencyForm(forms.ModelForm):
+    """
+    Form for adding a prerequisite to a task.
+
+    Form fields:
+    depends_on (ModelChoiceField): ID of the task of the same project that has to be completed first.
+
+    Methods:
+    Meta: Defines the model the form is bound to and the fields to use.
+    """
+    class Meta:
+        model = TaskDependency
+        fields = ["depends_on"]
+
+    def __init__(self, *args, project, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["depends_on"].queryset = Task.objects.filter(project=project)
@@ -0,0 +1,63 @@
+import time
+import tracemalloc
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from projects.models import Project
+from projects.seeding import seed_tasks
+
+
+class Command(BaseCommand):
+    """
+    Compares the buffered and the streaming task list on a project with many tasks.
+
+    The requests run in autocommit mode like real requests, so the streaming cursor is the one
+    production uses; the benchmark user and its project are deleted at the end.
+    For each mode the command reports the time to the first task row, the total time,
+    the response size and the peak Python memory allocated while serving the request.
+    Memory is traced in a separate request, so that tracing doesn't distort the timings.
+    """
+    help = "Benchmarks the buffered and streaming task list on a large project."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=100000, help="Number of tasks in the project.")
+
+    def handle(self, *args, **options):
+        user = User.objects.create(username="bench-task-list", password="!")
+        try:
+            project = Project.objects.create(name="Benchmark", user=user)
+            seed_tasks(project.id, options["tasks"])
+            client = Client(SERVER_NAME="localhost")
+            client.force_login(user)
+            url = reverse("task_list", args=[project.id])
+            for mode in ("0", "1"):
+                first_row, total, size = self.measure(client, url, mode)
+                tracemalloc.start()
+                self.measure(client, url, mode)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.report("streaming" if mode == "1" else "buffered", first_row, total, size, peak)
+        finally:
+            user.delete()
+
+    def measure(self, client, url: str, mode: str) -> tuple[float, float, int]:
+        start = time.perf_counter()
+        response = client.get(url, {"stream": mode})
+        if response.streaming:
+            # The first chunk is the markup around the rows, sent before the task query runs.
+            chunks = iter(response.streaming_content)
+            size = len(next(chunks, b""))
+            size += len(next(chunks, b""))
+            first_row = time.perf_counter() - start
+            size += sum(len(chunk) for chunk in chunks)
+        else:
+            first_row = time.perf_counter() - start
+            size = len(response.content)
+        return first_row, time.perf_counter() - start, size
+
+    def report(self, mode: str, first_row: float, total: float, size: int, peak: int) -> None:
+        self.stdout.write(
+            f"{mode:<10} first row {first_row * 1000:>9.1f} ms  total {total * 1000:>9.1f} ms  "
+            f"size {size / 1024 / 1024:>7.1f} MiB  peak memory {peak / 1024 / 1024:>7.1f} MiB"
+        )
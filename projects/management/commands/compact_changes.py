@@ -0,0 +1,33 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from projects.models import Change, ChangeCompaction
+
+
+class Command(BaseCommand):
+    """
+    Removes change log entries older than the retention period.
+
+    For every affected user the ID of the newest removed entry is stored,
+    so that clients with an older cursor are told to resync.
+    """
+    help = "Removes old change log entries and records the compaction point per user."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Number of days of changes to keep.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        old = Change.objects.filter(created_at__lt=cutoff)
+        with transaction.atomic():
+            points = [
+                ChangeCompaction(user_id=row["user"], last_id=row["last_id"])
+                for row in old.values("user").annotate(last_id=Max("id")).order_by()
+            ]
+            ChangeCompaction.objects.bulk_create(
+                points, update_conflicts=True, unique_fields=["user"], update_fields=["last_id"]
+            )
+            deleted, _ = Change.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(f"Removed {deleted} changes for {len(points)} users.")
@@ -0,0 +1,43 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from projects.models import Project, Task
+from projects.plans import check_plans, explain_views
+
+
+class Command(BaseCommand):
+    """
+    Explains the queries every view issues and reports plan shapes and costs.
+
+    Run it against a PostgreSQL database filled by seed_tasks.
+    With --check the command fails if a hot query lost its expected index scan.
+    """
+    help = "Reports the query plans of all views and checks them for sequential scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, help="ID of the project to call the views for.")
+        parser.add_argument("--json", dest="json_path", help="Write the report as JSON to this file.")
+        parser.add_argument("--check", action="store_true", help="Fail if a plan degraded.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plans are only checked against PostgreSQL.")
+        if options["project"]:
+            project = Project.objects.filter(id=options["project"]).first()
+        else:
+            project = Project.objects.filter(id=Task.objects.order_by("-id").values("project_id")[:1]).first()
+        if project is None:
+            raise CommandError("No project with tasks found, run seed_tasks first.")
+
+        plans = explain_views(project)
+        for plan in plans:
+            self.stdout.write(f"{plan.view:<20} cost={plan.cost:>10.2f} rows={plan.rows:>8}  {plan.shape}")
+        if options["json_path"]:
+            with open(options["json_path"], "w") as file:
+                json.dump([{**vars(plan), "indexes": sorted(plan.indexes)} for plan in plans], file, indent=2)
+
+        problems = check_plans(plans)
+        for problem in problems:
+            self.stderr.write(problem)
+        if problems and options["check"]:
+            raise CommandError(f"{len(problems)} query plans degraded.")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from projects.seeding import seed
+
+
+class Command(BaseCommand):
+    """
+    Fills the database with a synthetic dataset of users, projects and tasks.
+    """
+    help = "Creates synthetic users, projects and tasks for plan checks and benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Number of users to create.")
+        parser.add_argument("--projects", type=int, default=10, help="Number of projects per user.")
+        parser.add_argument("--tasks", type=int, default=100, help="Number of tasks per project.")
+        parser.add_argument("--prefix", default="seed", help="Prefix of the created usernames.")
+
+    def handle(self, *args, **options):
+        project_ids = seed(options["users"], options["projects"], options["tasks"], options["prefix"])
+        self.stdout.write(f"Created {len(project_ids)} projects with {len(project_ids) * options['tasks']} tasks.")
@@ -0,0 +1,143 @@
+import os
+import time
+from contextvars import ContextVar
+from django.db import connection
+from django.template.backends.django import DjangoTemplates, Template
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import REGISTRY
+from .estimates import estimate_count
+from .models import Change, Project, Task
+
+REQUESTS = Counter(
+    "task_manager_http_requests_total", "Number of HTTP requests.", ["view", "method", "status"]
+)
+REQUEST_DURATION = Histogram(
+    "task_manager_http_request_duration_seconds", "Time spent handling a request.", ["view"]
+)
+DB_QUERIES = Histogram(
+    "task_manager_db_queries_per_request", "Number of database queries per request.", ["view"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200),
+)
+DB_DURATION = Histogram(
+    "task_manager_db_duration_seconds", "Time spent in database queries per request.", ["view"]
+)
+TEMPLATE_DURATION = Histogram(
+    "task_manager_template_render_duration_seconds", "Time spent rendering templates per request.", ["view"]
+)
+
+current_stats = ContextVar("current_stats", default=None)
+
+
+class RequestStats:
+    """
+    Database and template time collected while handling a request.
+    """
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+class TimedTemplate(Template):
+    """
+    Template that adds its render time to the stats of the current request.
+
+    Views pass unevaluated querysets to templates, so queries often run during the render.
+    Their time is subtracted: it is counted as database time only.
+    """
+    def render(self, context=None, request=None):
+        stats = current_stats.get()
+        if stats is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        db_time = stats.db_time
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start - (stats.db_time - db_time)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend that measures the render time of its templates.
+    """
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class MetricsMiddleware:
+    """
+    Records the request count, latency, database queries and template render time of every request,
+    labeled with the URL name of the view.
+
+    Rows a streaming response renders after the view returned are not included.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats):
+                response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else "unmatched"
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        REQUEST_DURATION.labels(view).observe(duration)
+        DB_QUERIES.labels(view).observe(stats.queries)
+        DB_DURATION.labels(view).observe(stats.db_time)
+        TEMPLATE_DURATION.labels(view).observe(stats.template_time)
+        return response
+
+
+class TableSizeCollector:
+    """
+    Reports the number of rows of the project, task and change tables at scrape time.
+
+    Uses the planner's estimate where the database provides one, and an exact count otherwise.
+    """
+    def collect(self):
+        gauge = GaugeMetricFamily("task_manager_table_rows", "Estimated number of rows in a table.", labels=["table"])
+        for model in (Project, Task, Change):
+            rows = estimate_count(model)
+            if rows is None:
+                rows = model.objects.count()
+            gauge.add_metric([model._meta.db_table], rows)
+        yield gauge
+
+
+def export() -> bytes:
+    """
+    Renders all metrics in the Prometheus text format.
+
+    When PROMETHEUS_MULTIPROC_DIR is set, the values written by all worker processes are aggregated.
+
+    Returns:
+    bytes: The metrics page.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    tables = CollectorRegistry()
+    tables.register(TableSizeCollector())
+    return generate_latest(registry) + generate_latest(tables)
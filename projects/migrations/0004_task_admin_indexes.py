@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_change_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['deadline'], name='projects_ta_deadlin_abbe13_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'deadline'], name='projects_ta_status_229080_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-19 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_task_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'priority'], name='task_project_priority_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.5 on 2026-10-19 10:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def set_topo_order(apps, schema_editor):
+    # Without dependencies the priority order is a valid topological order.
+    Task = apps.get_model("projects", "Task")
+    Task.objects.update(topo_order=models.F("priority"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_task_project_priority_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDependency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='topo_order',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='unmet_dependencies',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(set_topo_order, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', False)), fields=['project', 'unmet_dependencies', 'priority'], name='task_ready_idx'),
+        ),
+        migrations.AddField(
+            model_name='taskdependency',
+            name='depends_on',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependent_links', to='projects.task'),
+        ),
+        migrations.AddField(
+            model_name='taskdependency',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prerequisite_links', to='projects.task'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskdependency',
+            constraint=models.UniqueConstraint(fields=('task', 'depends_on'), name='unique_task_dependency'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-19 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_task_dependencies'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'topo_order'], name='task_project_topo_order_idx'),
+        ),
+    ]
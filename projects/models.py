@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 # Create your models here.
 
@@ -31,19 +31,36 @@ class Task(models.Model):
     priority (IntegerField): Priority of the task, determines the order of execution.
     status (BooleanField): Status of the task (True - completed, False - not completed).
     deadline (DateTimeField): Date and time of task execution.
+    topo_order (IntegerField): Position of the task in a topological order of the project's dependencies,
+    every task comes after the tasks it depends on.
+    unmet_dependencies (PositiveIntegerField): Number of not completed tasks the task depends on.
 
     Methods:
     __str__(): Returns a string representation of the task as "Task: {name}".
-    save(): Overridden method for automatically assigning a priority to a task before saving.
+    save(): Overridden method for automatically assigning a priority to a task before saving
+    and detecting status changes.
+    move_up(): Swaps the priority of the task with the previous task of the project.
+    move_down(): Swaps the priority of the task with the next task of the project.
+    toggle_status(): Marks the task as completed or not completed.
     """
     name = models.CharField(max_length=255)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="tasks")
     priority = models.IntegerField()
     status = models.BooleanField(default=False)
     deadline = models.DateTimeField()
+    topo_order = models.IntegerField(default=0)
+    unmet_dependencies = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["priority"]
+        indexes = [
+            models.Index(fields=["project", "priority"], name="task_project_priority_idx"),
+            models.Index(fields=["project", "topo_order"], name="task_project_topo_order_idx"),
+            models.Index(fields=["deadline"]),
+            models.Index(fields=["status", "deadline"]),
+            models.Index(fields=["project", "unmet_dependencies", "priority"], name="task_ready_idx",
+                         condition=models.Q(status=False)),
+        ]
 
     def __str__(self):
         return f"Task: {self.name}"
@@ -53,9 +70,139 @@ class Task(models.Model):
         Override the save method to automatically assign a priority to a task.
 
         When a new task is created,
-        it is assigned the lowest priority among the tasks in the project.
+        it is assigned the lowest priority among the tasks in the project
+        and placed last in the project's topological order, which keeps the order valid
+        because nothing depends on a new task yet.
+
+        When the status of an existing task changes, status_changed is set for the post_save receiver
+        that updates the unmet dependency counters of the waiting tasks. The stored status is read
+        with a row lock, so concurrent saves of the same task can't both see the old status.
         """
         if not self.pk:
-            max_priority = Task.objects.filter(project=self.project).aggregate(models.Max("priority"))["priority__max"]
-            self.priority = (max_priority or 0) + 1
-        super().save(*args, **kwargs)
+            last = Task.objects.filter(project=self.project).aggregate(models.Max("priority"), models.Max("topo_order"))
+            self.priority = (last["priority__max"] or 0) + 1
+            self.topo_order = (last["topo_order__max"] or 0) + 1
+        update_fields = kwargs.get("update_fields")
+        if self._state.adding or (update_fields is not None and "status" not in update_fields):
+            self.status_changed = False
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            stored = Task.objects.select_for_update().filter(pk=self.pk).values_list("status", flat=True).first()
+            self.status_changed = stored is not None and stored != self.status
+            super().save(*args, **kwargs)
+
+    def swap_priority(self, other) -> None:
+        """
+        Swaps the priorities of two tasks and saves only the priority field.
+        """
+        self.priority, other.priority = other.priority, self.priority
+        other.project = self.project
+        self.save(update_fields=["priority"])
+        other.save(update_fields=["priority"])
+
+    def move_up(self) -> None:
+        """
+        Moves the task one place up in the project's priority order.
+        Does nothing if the task is the first one.
+        """
+        prev_task = Task.objects.filter(
+            project_id=self.project_id, priority__lt=self.priority
+        ).order_by('-priority').first()
+        if prev_task:
+            self.swap_priority(prev_task)
+
+    def move_down(self) -> None:
+        """
+        Moves the task one place down in the project's priority order.
+        Does nothing if the task is the last one.
+        """
+        next_task = Task.objects.filter(
+            project_id=self.project_id, priority__gt=self.priority
+        ).order_by('priority').first()
+        if next_task:
+            self.swap_priority(next_task)
+
+    def toggle_status(self) -> None:
+        """
+        Marks the task as completed if it wasn't, and as not completed otherwise.
+        """
+        self.status = not self.status
+        self.save(update_fields=["status"])
+
+
+class TaskDependency(models.Model):
+    """
+    Model for storing that a task can't start until another task of the same project is completed.
+
+    Attributes:
+    task (ForeignKey): The task that waits.
+    depends_on (ForeignKey): The task that has to be completed first.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="prerequisite_links")
+    depends_on = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="dependent_links")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["task", "depends_on"], name="unique_task_dependency"),
+        ]
+
+    def __str__(self):
+        return f"Dependency: {self.task_id} on {self.depends_on_id}"
+
+
+class Change(models.Model):
+    """
+    Model for storing an entry of the per-user change log.
+
+    Every write to a project or a task appends one entry. Clients use the entry id
+    as a sync cursor and only fetch entries recorded after it.
+
+    Attributes:
+    user (ForeignKey): Reference to the user the change belongs to.
+    model (CharField): Kind of the changed object ("project", "task" or "dependency").
+    object_id (BigIntegerField): ID of the changed object.
+    action (CharField): Kind of the change (create, update, delete or reorder).
+    data (JSONField): Compact state of the object after the change.
+    created_at (DateTimeField): Date and time the change was recorded.
+    """
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+    REORDER = "reorder"
+    ACTION_CHOICES = [
+        (CREATE, "Create"),
+        (UPDATE, "Update"),
+        (DELETE, "Delete"),
+        (REORDER, "Reorder"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="changes")
+    model = models.CharField(max_length=16)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["user", "id"])]
+
+    def __str__(self):
+        return f"Change: {self.action} {self.model} {self.object_id}"
+
+
+class ChangeCompaction(models.Model):
+    """
+    Model for storing how far the user's change log has been compacted.
+
+    Attributes:
+    user (OneToOneField): Reference to the user the change log belongs to.
+    last_id (BigIntegerField): ID of the newest change removed by compaction.
+    Cursors older than this value can no longer be served and require a full resync.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="change_compaction")
+    last_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Compaction: {self.user_id} through {self.last_id}"
@@ -0,0 +1,215 @@
+import json
+from dataclasses import dataclass, field
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import Change, Project, Task
+
+# Tables that grow with the dataset. A sequential scan on any of them fails the check.
+LARGE_TABLES = {Project._meta.db_table, Task._meta.db_table, Change._meta.db_table}
+
+# Indexes the hot queries of a view are expected to use.
+EXPECTED_INDEXES = {
+    "task_list": {"task_project_priority_idx"},
+    "task_create": {"task_project_priority_idx", "task_project_topo_order_idx"},
+    "task_priority_up": {"task_project_priority_idx"},
+    "task_priority_down": {"task_project_priority_idx"},
+    "task_batch": {"task_project_priority_idx"},
+    "task_ready_list": {"task_ready_idx"},
+}
+
+EXPLAINED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+
+@dataclass
+class QueryPlan:
+    """
+    Plan of a single query issued by a view.
+
+    Attributes:
+    view (str): URL name of the view that issued the query.
+    sql (str): The query with its parameters.
+    shape (str): Compact description of the plan tree.
+    cost (float): Total cost estimated by the planner.
+    rows (int): Number of rows estimated by the planner.
+    seq_scans (list[str]): Large tables read with a sequential scan.
+    indexes (set[str]): Indexes used by the plan.
+    """
+    view: str
+    sql: str
+    shape: str
+    cost: float
+    rows: int
+    seq_scans: list[str] = field(default_factory=list)
+    indexes: set[str] = field(default_factory=set)
+
+
+def plan_nodes(plan: dict):
+    """
+    Walks the nodes of an EXPLAIN (FORMAT JSON) plan tree depth-first.
+
+    Args:
+    plan (dict): The "Plan" object of the EXPLAIN output.
+
+    Yields:
+    dict: Plan node.
+    """
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def plan_shape(plan: dict) -> str:
+    """
+    Describes a plan tree as a single line, e.g. "Limit(Index Scan task_project_priority_idx)".
+
+    Args:
+    plan (dict): The "Plan" object of the EXPLAIN output.
+
+    Returns:
+    str: Node types with the scanned index or relation, children in parentheses.
+    """
+    label = plan["Node Type"]
+    target = plan.get("Index Name") or plan.get("Relation Name")
+    if target:
+        label = f"{label} {target}"
+    children = plan.get("Plans", [])
+    if children:
+        label += "(" + ", ".join(plan_shape(child) for child in children) + ")"
+    return label
+
+
+def analyze_plan(view: str, sql: str, plan: dict) -> QueryPlan:
+    """
+    Summarizes the plan of a query.
+
+    Args:
+    view (str): URL name of the view that issued the query.
+    sql (str): The explained query.
+    plan (dict): The "Plan" object of the EXPLAIN output.
+
+    Returns:
+    QueryPlan: Shape, cost, sequential scans on large tables and used indexes.
+    """
+    nodes = list(plan_nodes(plan))
+    return QueryPlan(
+        view=view,
+        sql=sql,
+        shape=plan_shape(plan),
+        cost=plan["Total Cost"],
+        rows=plan["Plan Rows"],
+        seq_scans=[node["Relation Name"] for node in nodes
+                   if node["Node Type"] == "Seq Scan" and node["Relation Name"] in LARGE_TABLES],
+        indexes={node["Index Name"] for node in nodes if "Index Name" in node},
+    )
+
+
+def explain(sql: str) -> dict:
+    """
+    Runs EXPLAIN for a query without executing it.
+
+    Args:
+    sql (str): The query with its parameters.
+
+    Returns:
+    dict: The "Plan" object of the EXPLAIN output.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql)
+        output = cursor.fetchone()[0]
+    if isinstance(output, str):
+        output = json.loads(output)
+    return output[0]["Plan"]
+
+
+def view_requests(project: Project, task: Task) -> list[tuple]:
+    """
+    Lists a request for every view of the projects app.
+
+    Args:
+    project (Project): Project the requests operate on.
+    task (Task): Task of the project the requests operate on.
+
+    Returns:
+    list[tuple]: URL name, HTTP method, URL and form data of each request.
+    """
+    deadline = timezone.now().strftime("%Y-%m-%dT%H:%M")
+    other = Task.objects.filter(project=project).exclude(id=task.id).order_by("priority").first() or task
+    return [
+        ("home", "get", reverse("home"), None),
+        ("project_list", "get", reverse("project_list"), None),
+        ("project_create", "post", reverse("project_create"), {"name": "Plan check"}),
+        ("project_update", "post", reverse("project_update", args=[project.id]), {"name": "Plan check"}),
+        ("task_list", "get", reverse("task_list", args=[project.id]), None),
+        ("task_create", "post", reverse("task_create", args=[project.id]),
+         {"name": "Plan check", "deadline": deadline}),
+        ("task_update", "post", reverse("task_update", args=[project.id, task.id]),
+         {"name": "Plan check", "deadline": deadline}),
+        ("task_priority_up", "post", reverse("task_priority_up", args=[project.id, task.id]), None),
+        ("task_priority_down", "post", reverse("task_priority_down", args=[project.id, task.id]), None),
+        ("task_status_toggle", "post", reverse("task_status_toggle", args=[project.id, task.id]), None),
+        ("task_batch", "post", reverse("task_batch", args=[project.id]), {"operations": json.dumps([
+            {"op": "up", "task": task.id}, {"op": "down", "task": task.id}, {"op": "toggle", "task": task.id},
+        ])}),
+        ("task_ready_list", "get", reverse("task_ready_list", args=[project.id]), None),
+        ("task_dependency_add", "post", reverse("task_dependency_add", args=[project.id, task.id]),
+         {"depends_on": other.id}),
+        ("task_dependency_remove", "delete",
+         reverse("task_dependency_remove", args=[project.id, task.id, other.id]), None),
+        ("task_delete", "delete", reverse("task_delete", args=[project.id, task.id]), None),
+        ("project_delete", "delete", reverse("project_delete", args=[project.id]), None),
+        ("change_list", "get", reverse("change_list"), {"cursor": 0}),
+    ]
+
+
+def explain_views(project: Project, task: Task | None = None) -> list[QueryPlan]:
+    """
+    Calls every view as the project owner and explains the queries it issues.
+
+    Each request runs in a transaction that is rolled back, so the data is left unchanged.
+    Queries are explained inside the same transaction, against the state the view saw.
+
+    Args:
+    project (Project): Project the requests operate on.
+    task (Task): Task the requests operate on, a task from the middle of the project by default.
+
+    Returns:
+    list[QueryPlan]: Plans of the SELECT, UPDATE and DELETE queries of all views.
+    """
+    if task is None:
+        middle = Task.objects.filter(project=project).count() // 2
+        task = Task.objects.filter(project=project).order_by("priority")[middle]
+    client = Client(SERVER_NAME="localhost")
+    client.force_login(project.user)
+    plans = []
+    for view, method, url, data in view_requests(project, task):
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as context:
+                getattr(client, method)(url, data)
+            for query in context.captured_queries:
+                sql = query["sql"]
+                if sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+                    plans.append(analyze_plan(view, sql, explain(sql)))
+            transaction.set_rollback(True)
+    return plans
+
+
+def check_plans(plans: list[QueryPlan]) -> list[str]:
+    """
+    Compares the plans with the expectations.
+
+    Args:
+    plans (list[QueryPlan]): Plans returned by explain_views.
+
+    Returns:
+    list[str]: Description of every degraded plan, empty if all plans are as expected.
+    """
+    problems = [f"{plan.view}: sequential scan on {', '.join(plan.seq_scans)}: {plan.sql}"
+                for plan in plans if plan.seq_scans]
+    for view, expected in EXPECTED_INDEXES.items():
+        used = set().union(*(plan.indexes for plan in plans if plan.view == view))
+        for index in sorted(expected - used):
+            problems.append(f"{view}: index {index} is not used")
+    return problems
@@ -0,0 +1,193 @@
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+PROFILE_NAME = re.compile(r"[\w-]+")
+PROFILE_EXTENSIONS = ("folded", "json")
+
+
+def collapse_stack(frame) -> str:
+    """
+    Describes a call stack as one line of the collapsed (folded) stack format.
+
+    Args:
+    frame (FrameType): The innermost frame of the stack.
+
+    Returns:
+    str: Frames from the outermost to the innermost, separated by semicolons.
+    """
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class StackSampler(threading.Thread):
+    """
+    Thread that periodically records the call stack of another thread.
+
+    Attributes:
+    stacks (Counter): Number of samples per collapsed stack.
+    """
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def stop(self) -> Counter:
+        self.stopped.set()
+        self.join()
+        return self.stacks
+
+
+class QueryTimer:
+    """
+    Database execute wrapper that records the duration of every query.
+    """
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({"sql": sql, "duration_ms": (time.perf_counter() - start) * 1000})
+
+
+class ProfilingMiddleware:
+    """
+    Records a call-stack profile and SQL timings of selected requests.
+
+    A request is profiled when a staff user passes the "profile" query flag or the X-Profile header,
+    or when it is picked by sampling one in PROFILING_SAMPLE_RATE requests.
+    The stacks are written to PROFILING_DIR in the collapsed format read by flamegraph.pl and speedscope,
+    next to a JSON file with the request details and SQL timings.
+
+    The middleware is removed from the stack when PROFILING_ENABLED is off.
+    """
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directory = Path(settings.PROFILING_DIR)
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.interval = settings.PROFILING_INTERVAL
+        self.max_profiles = settings.PROFILING_MAX_PROFILES
+
+    def should_profile(self, request) -> bool:
+        if "profile" in request.GET or "HTTP_X_PROFILE" in request.META:
+            return request.user.is_staff
+        return self.sample_rate > 0 and random.randrange(self.sample_rate) == 0
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        timer = QueryTimer()
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            with connection.execute_wrapper(timer):
+                response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        duration = (time.perf_counter() - start) * 1000
+        self.save(request, response, duration, stacks, timer.queries)
+        return response
+
+    def save(self, request, response, duration: float, stacks: Counter, queries: list[dict]) -> None:
+        """
+        Writes the collapsed stacks and the request details of a profiled request.
+        """
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / f"{name}.folded", "w") as file:
+            for stack, count in stacks.items():
+                file.write(f"{stack} {count}\n")
+        details = {
+            "name": name,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "user": request.user.get_username() if request.user.is_authenticated else None,
+            "status": response.status_code,
+            "duration_ms": duration,
+            "samples": sum(stacks.values()),
+            "sql_ms": sum(query["duration_ms"] for query in queries),
+            "queries": queries,
+        }
+        with open(self.directory / f"{name}.json", "w") as file:
+            json.dump(details, file, indent=2)
+        self.prune()
+
+    def prune(self) -> None:
+        """
+        Removes the oldest profiles beyond PROFILING_MAX_PROFILES.
+
+        Profile names start with their capture time, so sorting them by name sorts them by age.
+        """
+        names = sorted({path.stem for extension in PROFILE_EXTENSIONS
+                        for path in self.directory.glob(f"*.{extension}")})
+        for name in names[:max(len(names) - self.max_profiles, 0)]:
+            for extension in PROFILE_EXTENSIONS:
+                (self.directory / f"{name}.{extension}").unlink(missing_ok=True)
+
+
+def list_profiles(limit: int = 200) -> list[dict]:
+    """
+    Reads the details of the newest captured profiles.
+
+    Args:
+    limit (int): Maximum number of profiles to return.
+
+    Returns:
+    list[dict]: Request details of every profile, newest first.
+    """
+    directory = Path(settings.PROFILING_DIR)
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in sorted(directory.glob("*.json"), reverse=True)[:limit]:
+        with open(path) as file:
+            profiles.append(json.load(file))
+    return profiles
+
+
+def profile_path(name: str, extension: str) -> Path | None:
+    """
+    Returns the path of a captured profile file if it exists.
+
+    Only the files written by the profiler are served, other files in the directory are never returned.
+
+    Args:
+    name (str): Name of the profile.
+    extension (str): "folded" for the stacks or "json" for the request details.
+
+    Returns:
+    Path: Path of the file.
+    None: The name or the extension is invalid, or no such profile exists.
+    """
+    if not PROFILE_NAME.fullmatch(name) or extension not in PROFILE_EXTENSIONS:
+        return None
+    path = Path(settings.PROFILING_DIR) / f"{name}.{extension}"
+    return path if path.is_file() else None
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from itertools import islice
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from .models import Project, Task
+
+BATCH_SIZE = 5000
+
+
+def seed(users: int, projects_per_user: int, tasks_per_project: int, prefix: str = "seed") -> list[int]:
+    """
+    Fills the database with a synthetic dataset for plan checks and benchmarks.
+
+    Rows are inserted with batched bulk_create calls, so no model signals are sent
+    and the change log stays empty. On PostgreSQL the tables are analyzed afterwards,
+    so that the planner works with up-to-date statistics.
+
+    Args:
+    users (int): Number of users to create.
+    projects_per_user (int): Number of projects created for every user.
+    tasks_per_project (int): Number of tasks created in every project.
+    prefix (str): Prefix of the created usernames, must not be used by existing users.
+
+    Returns:
+    list[int]: IDs of the created projects.
+    """
+    owners = User.objects.bulk_create(
+        [User(username=f"{prefix}-{i}", password="!") for i in range(users)], batch_size=BATCH_SIZE
+    )
+    projects = Project.objects.bulk_create(
+        [Project(name=f"Project {i}", user=owner) for owner in owners for i in range(projects_per_user)],
+        batch_size=BATCH_SIZE,
+    )
+    project_ids = [project.id for project in projects]
+    bulk_insert(task for project_id in project_ids for task in synthetic_tasks(project_id, tasks_per_project))
+    analyze()
+    return project_ids
+
+
+def seed_tasks(project_id: int, count: int) -> None:
+    """
+    Appends synthetic tasks to the end of the project's priority and topological order.
+
+    Args:
+    project_id (int): ID of the project to fill.
+    count (int): Number of tasks to create.
+    """
+    last = Task.objects.filter(project_id=project_id).aggregate(Max("priority"), Max("topo_order"))
+    start = max(last["priority__max"] or 0, last["topo_order__max"] or 0)
+    bulk_insert(synthetic_tasks(project_id, count, start))
+
+
+def synthetic_tasks(project_id: int, count: int, start: int = 0):
+    """
+    Generates unsaved synthetic tasks with consecutive priorities.
+
+    Every third task is completed, deadlines are spread one hour apart.
+
+    Args:
+    project_id (int): ID of the project the tasks belong to.
+    count (int): Number of tasks to generate.
+    start (int): Priority and topological position after which the generated tasks are placed.
+
+    Yields:
+    Task: Unsaved task.
+    """
+    now = timezone.now()
+    for i in range(count):
+        yield Task(
+            name=f"Task {i}",
+            project_id=project_id,
+            priority=start + i + 1,
+            topo_order=start + i + 1,
+            status=i % 3 == 0,
+            deadline=now + timedelta(hours=i),
+        )
+
+
+def bulk_insert(tasks) -> None:
+    """
+    Inserts tasks from an iterable in batches without keeping them all in memory.
+
+    Args:
+    tasks (Iterable[Task]): Unsaved tasks.
+    """
+    tasks = iter(tasks)
+    while batch := list(islice(tasks, BATCH_SIZE)):
+        Task.objects.bulk_create(batch)
+
+
+def analyze() -> None:
+    """
+    Refreshes the planner statistics of the projects tables on PostgreSQL.
+    """
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for model in (User, Project, Task):
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
@@ -0,0 +1,84 @@
+from django.contrib.auth.models import User
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .changes import record_dependency, record_project, record_task
+from .dependencies import update_unmet_dependencies
+from .models import Change, Project, Task, TaskDependency
+
+
+def deleted_with(origin, *models) -> bool:
+    """
+    Checks whether a delete was started from an instance or queryset of the given models.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in models
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance: Project, created: bool, **kwargs) -> None:
+    """
+    Records a created or updated project in the owner's change log.
+    """
+    record_project(instance, Change.CREATE if created else Change.UPDATE)
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance: Project, origin=None, **kwargs) -> None:
+    """
+    Records a deleted project in the owner's change log.
+
+    Nothing is recorded when the owner is deleted together with the change log.
+    """
+    if deleted_with(origin, User):
+        return
+    record_project(instance, Change.DELETE)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance: Task, created: bool, update_fields=None, **kwargs) -> None:
+    """
+    Records a created, updated or reordered task in the project owner's change log.
+
+    A save limited to the priority field is recorded as a reorder.
+    A status change updates the unmet dependency counters of the tasks waiting for the task.
+    """
+    if getattr(instance, "status_changed", False):
+        update_unmet_dependencies([instance.pk], instance.status)
+    if created:
+        action = Change.CREATE
+    elif update_fields is not None and set(update_fields) == {"priority"}:
+        action = Change.REORDER
+    else:
+        action = Change.UPDATE
+    record_task(instance, action)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance: Task, origin=None, **kwargs) -> None:
+    """
+    Records a deleted task in the project owner's change log.
+
+    Tasks removed together with their project are covered by the project's delete entry.
+    """
+    if deleted_with(origin, User, Project):
+        return
+    record_task(instance, Change.DELETE)
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleting(sender, instance: Task, origin=None, **kwargs) -> None:
+    """
+    Records the removal of a task's dependency links and releases the tasks waiting for it
+    before the task is deleted with its links.
+
+    Nothing is updated when the waiting tasks are deleted with the same project.
+    """
+    if deleted_with(origin, User, Project):
+        return
+    user_id = instance.project.user_id
+    links = TaskDependency.objects.filter(Q(task=instance) | Q(depends_on=instance))
+    for link in links.select_related("task"):
+        record_dependency(link, Change.DELETE, user_id)
+    if not instance.status:
+        update_unmet_dependencies([instance.pk], True)
@@ -0,0 +1,105 @@
+// Collects reorder and toggle clicks of a task list and sends them to the server in one batch.
+// Clicks are applied to the page right away; the batch is sent once the clicks pause,
+// and at most one batch per list is in flight, so the server applies them in click order.
+// If the server rejects a batch, the list is reloaded, so the page doesn't keep showing clicks that weren't applied.
+(function () {
+    const DEBOUNCE_MS = 300;
+    const queues = new Map();
+
+    function queueFor(container) {
+        const url = container.dataset.batchUrl;
+        if (!queues.has(url)) {
+            queues.set(url, {
+                url: url,
+                listUrl: container.dataset.listUrl,
+                target: container.dataset.batchTarget,
+                operations: [],
+                timer: null,
+                inFlight: false,
+            });
+        }
+        return queues.get(url);
+    }
+
+    function enqueue(queue, op, task) {
+        if (op === "toggle") {
+            const index = queue.operations.findIndex((operation) => operation.op === "toggle" && operation.task === task);
+            if (index !== -1) {
+                queue.operations.splice(index, 1);
+                return;
+            }
+        }
+        queue.operations.push({op: op, task: task});
+    }
+
+    function applyToPage(target, operation) {
+        const row = document.querySelector(`${target} [data-task-row="${operation.task}"]`);
+        if (!row) {
+            return;
+        }
+        if (operation.op === "up" && row.previousElementSibling) {
+            row.parentNode.insertBefore(row, row.previousElementSibling);
+        } else if (operation.op === "down" && row.nextElementSibling) {
+            row.parentNode.insertBefore(row.nextElementSibling, row);
+        } else if (operation.op === "toggle") {
+            const checkbox = row.querySelector('[data-batch-op="toggle"]');
+            checkbox.checked = !checkbox.checked;
+        }
+    }
+
+    function schedule(queue) {
+        clearTimeout(queue.timer);
+        queue.timer = setTimeout(() => flush(queue), DEBOUNCE_MS);
+    }
+
+    function flush(queue) {
+        if (queue.inFlight || queue.operations.length === 0) {
+            return;
+        }
+        const operations = queue.operations;
+        queue.operations = [];
+        queue.inFlight = true;
+        const target = document.querySelector(queue.target);
+        let failed = false;
+        const onAfterRequest = (event) => {
+            if (event.target === target) {
+                failed = event.detail.failed;
+            }
+        };
+        target.addEventListener("htmx:afterRequest", onAfterRequest);
+        htmx.ajax("POST", queue.url, {
+            source: target,
+            target: queue.target,
+            swap: "innerHTML",
+            values: {operations: JSON.stringify(operations)},
+        }).catch(() => {
+            failed = true;
+        }).then(() => {
+            target.removeEventListener("htmx:afterRequest", onAfterRequest);
+            // A rejected batch isn't swapped in, but its clicks are already shown: reload the server state.
+            return failed ? htmx.ajax("GET", queue.listUrl, {target: queue.target, swap: "innerHTML"}) : null;
+        }).finally(() => {
+            queue.inFlight = false;
+            // The swapped list reflects the server state; show the clicks that are still queued on top of it.
+            queue.operations.forEach((operation) => applyToPage(queue.target, operation));
+            if (queue.operations.length > 0) {
+                schedule(queue);
+            }
+        });
+    }
+
+    document.addEventListener("click", (event) => {
+        const control = event.target.closest("[data-batch-op]");
+        const container = control && control.closest("[data-batch-url]");
+        if (!container) {
+            return;
+        }
+        const queue = queueFor(container);
+        const operation = {op: control.dataset.batchOp, task: Number(control.dataset.task)};
+        enqueue(queue, operation.op, operation.task);
+        if (operation.op !== "toggle") {
+            applyToPage(queue.target, operation);
+        }
+        schedule(queue);
+    });
+})();
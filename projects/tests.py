@@ -1,7 +1,30 @@
-from django.test import TestCase
+import json
+import random
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+from django.db import connection
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
-from .models import Project, Task
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from .models import Change, ChangeCompaction, Project, Task, TaskDependency
+from .changes import changes_since
+from .coalescing import SingleFlight, coalesce_get
+from .dependencies import add_dependency, update_status
+from .plans import analyze_plan, check_plans, explain_views
+from .seeding import seed
+from .views import TASK_LIST_FIELDS
+from .metrics import RequestStats, current_stats
+from .warmup import warm_up
 from .forms import ProjectForm, TaskForm
 from django.utils import timezone
 # Create your tests here.
@@ -170,3 +193,629 @@ class TaskPriorityTest(TestCase):
         self.client.get(reverse('task_status_toggle', args=[self.project.id, task.id]))
         task.refresh_from_db()
         self.assertTrue(task.status)
+
+
+class ChangeFeedTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.project = Project.objects.create(name="Test Project", user=self.user)
+
+    def get_changes(self, cursor=0):
+        return self.client.get(reverse('change_list'), {'cursor': cursor})
+
+    def test_changes_are_recorded(self):
+        task = Task.objects.create(name="Task 1", project=self.project, deadline=timezone.now())
+        task.delete()
+        actions = list(Change.objects.values_list("model", "action"))
+        self.assertEqual(actions, [("project", "create"), ("task", "create"), ("task", "delete")])
+
+    def test_changes_since_cursor(self):
+        cursor = self.get_changes().json()["cursor"]
+        task = Task.objects.create(name="Task 1", project=self.project, deadline=timezone.now())
+        data = self.get_changes(cursor).json()
+        self.assertEqual(data["changes"], [{"model": "task", "id": task.id, "action": "create",
+                                            "data": {"project": self.project.id, "name": "Task 1",
+                                                     "priority": 1, "status": False,
+                                                     "deadline": task.deadline.isoformat(),
+                                                     "unmet_dependencies": 0}}])
+        self.assertEqual(self.get_changes(data["cursor"]).json()["changes"], [])
+
+    def test_changes_are_collapsed(self):
+        task1 = Task.objects.create(name="Task 1", project=self.project, deadline=timezone.now())
+        task2 = Task.objects.create(name="Task 2", project=self.project, deadline=timezone.now())
+        cursor = self.get_changes().json()["cursor"]
+        self.client.get(reverse('task_priority_up', args=[self.project.id, task2.id]))
+        self.client.get(reverse('task_priority_up', args=[self.project.id, task1.id]))
+        self.client.post(reverse('task_update', args=[self.project.id, task1.id]),
+                         {'name': 'Renamed', 'deadline': timezone.now()})
+        changes = {c["id"]: c for c in self.get_changes(cursor).json()["changes"]}
+        self.assertEqual(changes[task2.id]["action"], "reorder")
+        self.assertEqual(changes[task2.id]["data"], {"project": self.project.id, "priority": 2})
+        self.assertEqual(changes[task1.id]["action"], "update")
+        self.assertEqual(changes[task1.id]["data"]["name"], "Renamed")
+
+    def test_project_delete_covers_tasks(self):
+        Task.objects.create(name="Task 1", project=self.project, deadline=timezone.now())
+        cursor = self.get_changes().json()["cursor"]
+        self.client.delete(reverse('project_delete', args=[self.project.id]))
+        changes = self.get_changes(cursor).json()["changes"]
+        self.assertEqual(changes, [{"model": "project", "id": self.project.id, "action": "delete", "data": {}}])
+
+    def test_compacted_cursor_requires_resync(self):
+        Change.objects.update(created_at=timezone.now() - timedelta(days=40))
+        Task.objects.create(name="Task 1", project=self.project, deadline=timezone.now())
+        call_command("compact_changes", days=30, stdout=StringIO())
+        self.assertEqual(Change.objects.count(), 1)
+        response = self.get_changes(0)
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()["cursor"], Change.objects.get().id)
+
+    def test_recording_locks_the_change_log(self):
+        ChangeCompaction.objects.all().delete()
+        with CaptureQueriesContext(connection) as context:
+            Task.objects.create(name="Task 1", project=self.project, deadline=timezone.now())
+        self.assertTrue(ChangeCompaction.objects.filter(user=self.user, last_id=0).exists())
+        self.assertTrue(any("projects_changecompaction" in query["sql"] for query in context.captured_queries))
+        self.assertEqual(self.get_changes(0).status_code, 200)
+
+    def test_compaction_between_reads_requires_resync(self):
+        cursor = self.get_changes().json()["cursor"]
+        Task.objects.create(name="Task 1", project=self.project, deadline=timezone.now())
+        compacted = []
+
+        def compact_before_entries_are_read(execute, sql, params, many, context):
+            if sql.startswith("SELECT") and 'FROM "projects_change"' in sql and not compacted:
+                compacted.append(True)
+                last_id = Change.objects.filter(user=self.user).latest("id").id
+                ChangeCompaction.objects.filter(user=self.user).update(last_id=last_id)
+                Change.objects.filter(user=self.user).delete()
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(compact_before_entries_are_read):
+            self.assertIsNone(changes_since(self.user, cursor))
+
+
+class TaskAdminTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="adminpassword")
+        self.client.login(username="admin", password="adminpassword")
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.project = Project.objects.create(name="Test Project", user=self.user)
+        self.tasks = [Task.objects.create(name=f"Task {i}", project=self.project, deadline=timezone.now())
+                      for i in range(3)]
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:projects_task_changelist')
+        self.client.get(url)
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'owner': 'testuser', 'status__exact': '0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Task 2")
+
+    def test_mark_done_action(self):
+        cursor = Change.objects.latest("id").id
+        response = self.client.post(reverse('admin:projects_task_changelist'), {
+            'action': 'mark_done',
+            '_selected_action': [task.id for task in self.tasks[:2]],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Task.objects.order_by("id").values_list("status", flat=True)), [True, True, False])
+        changes = Change.objects.filter(id__gt=cursor, user=self.user)
+        self.assertEqual(sorted(c.object_id for c in changes), [task.id for task in self.tasks[:2]])
+        self.assertTrue(all(c.data["status"] for c in changes))
+
+    def test_project_is_read_only_on_change(self):
+        prerequisite, task = self.tasks[:2]
+        add_dependency(task, prerequisite)
+        other = Project.objects.create(name="Other", user=self.user)
+        deadline = timezone.localtime(task.deadline)
+        response = self.client.post(reverse('admin:projects_task_change', args=[task.id]), {
+            'name': task.name,
+            'project': other.id,
+            'priority': task.priority,
+            'deadline_0': deadline.strftime("%Y-%m-%d"),
+            'deadline_1': deadline.strftime("%H:%M:%S"),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Task.objects.get(id=task.id).project_id, self.project.id)
+        self.assertEqual(self.client.get(reverse('admin:projects_task_add')).status_code, 200)
+
+    def test_change_form_updates_unmet_dependencies(self):
+        prerequisite, task = self.tasks[:2]
+        add_dependency(task, prerequisite)
+        deadline = timezone.localtime(prerequisite.deadline)
+        response = self.client.post(reverse('admin:projects_task_change', args=[prerequisite.id]), {
+            'name': prerequisite.name,
+            'project': self.project.id,
+            'priority': prerequisite.priority,
+            'status': 'on',
+            'deadline_0': deadline.strftime("%Y-%m-%d"),
+            'deadline_1': deadline.strftime("%H:%M:%S"),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Task.objects.get(id=task.id).unmet_dependencies, 0)
+
+
+class QueryPlanReportTest(TestCase):
+    plan = {
+        "Node Type": "Limit", "Total Cost": 0.62, "Plan Rows": 1,
+        "Plans": [{"Node Type": "Index Scan", "Index Name": "task_project_priority_idx",
+                   "Relation Name": "projects_task", "Total Cost": 4.1, "Plan Rows": 7}],
+    }
+
+    def test_plan_shape(self):
+        plan = analyze_plan("task_priority_up", "SELECT 1", self.plan)
+        self.assertEqual(plan.shape, "Limit(Index Scan task_project_priority_idx)")
+        self.assertEqual(plan.indexes, {"task_project_priority_idx"})
+        self.assertEqual(plan.seq_scans, [])
+
+    def test_seq_scan_is_reported(self):
+        seq_scan = {"Node Type": "Seq Scan", "Relation Name": "projects_task", "Total Cost": 1e5, "Plan Rows": 7}
+        problems = check_plans([analyze_plan("task_list", "SELECT 1", seq_scan)])
+        self.assertIn("task_list: sequential scan on projects_task: SELECT 1", problems)
+        self.assertIn("task_list: index task_project_priority_idx is not used", problems)
+
+    def test_seed(self):
+        project_ids = seed(users=2, projects_per_user=2, tasks_per_project=3)
+        self.assertEqual(len(project_ids), 4)
+        self.assertEqual(list(Task.objects.filter(project_id=project_ids[0]).values_list("priority", flat=True)),
+                         [1, 2, 3])
+
+
+@skipUnless(connection.vendor == "postgresql", "Query plans are checked against PostgreSQL.")
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        project_ids = seed(users=200, projects_per_user=10, tasks_per_project=100)
+        cls.project = Project.objects.get(id=project_ids[len(project_ids) // 2])
+
+    def test_hot_queries_use_indexes(self):
+        plans = explain_views(self.project)
+        self.assertEqual(check_plans(plans), [])
+
+
+class WarmUpTest(TestCase):
+    def test_warm_up(self):
+        with self.assertNumQueries(0):
+            timings = warm_up()
+        self.assertEqual(set(timings), {"urls", "templates"})
+
+
+class ProfilingTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.staff = User.objects.create_user(username="staff", password="staffpassword", is_staff=True)
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.project = Project.objects.create(name="Test Project", user=self.staff)
+
+    def profiles(self):
+        return sorted(path.suffix for path in Path(self.directory.name).iterdir())
+
+    def test_disabled(self):
+        self.client.login(username="staff", password="staffpassword")
+        with override_settings(PROFILING_ENABLED=False, PROFILING_DIR=self.directory.name):
+            self.client.get(reverse('project_list'), {'profile': 1})
+        self.assertEqual(self.profiles(), [])
+
+    def test_staff_request_is_profiled(self):
+        self.client.login(username="staff", password="staffpassword")
+        with override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.directory.name):
+            self.client.get(reverse('task_list', args=[self.project.id]), HTTP_X_PROFILE="1")
+            response = self.client.get(reverse('profile_list'))
+        self.assertEqual(self.profiles(), [".folded", ".json"])
+        details = json.loads(next(Path(self.directory.name).glob("*.json")).read_text())
+        self.assertEqual(details["path"], reverse('task_list', args=[self.project.id]))
+        self.assertEqual(details["user"], "staff")
+        self.assertTrue(details["queries"])
+        self.assertContains(response, details["name"])
+
+    def test_flag_is_ignored_for_other_users(self):
+        self.client.login(username="testuser", password="testpassword")
+        with override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.directory.name):
+            self.client.get(reverse('project_list'), {'profile': 1})
+            response = self.client.get(reverse('profile_list'))
+        self.assertEqual(self.profiles(), [])
+        self.assertEqual(response.status_code, 302)
+
+    def test_sampling(self):
+        self.client.login(username="testuser", password="testpassword")
+        with override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.directory.name, PROFILING_SAMPLE_RATE=1):
+            self.client.get(reverse('project_list'))
+        self.assertEqual(self.profiles(), [".folded", ".json"])
+
+    def test_oldest_profiles_are_pruned(self):
+        directory = Path(self.directory.name)
+        for name in ["20000101-000000-old", "20000101-000001-older"]:
+            (directory / f"{name}.json").write_text("{}")
+            (directory / f"{name}.folded").write_text("")
+        self.client.login(username="testuser", password="testpassword")
+        with override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.directory.name,
+                               PROFILING_SAMPLE_RATE=1, PROFILING_MAX_PROFILES=2):
+            self.client.get(reverse('project_list'))
+        names = sorted({path.stem for path in directory.iterdir()})
+        self.assertEqual(len(names), 2)
+        self.assertNotIn("20000101-000000-old", names)
+        self.assertEqual(self.profiles(), [".folded", ".folded", ".json", ".json"])
+
+    def test_download_is_limited_to_profile_files(self):
+        (Path(self.directory.name) / "capture.json").write_text("{}")
+        (Path(self.directory.name) / "capture.txt").write_text("secret")
+        self.client.login(username="staff", password="staffpassword")
+        with override_settings(PROFILING_DIR=self.directory.name):
+            self.assertEqual(self.client.get("/profiles/capture.json").status_code, 200)
+            self.assertEqual(self.client.get("/profiles/capture.txt").status_code, 404)
+
+
+class TaskBatchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.project = Project.objects.create(name="Test Project", user=self.user)
+        self.tasks = [Task.objects.create(name=f"Task {i}", project=self.project, deadline=timezone.now())
+                      for i in range(3)]
+
+    def post_batch(self, operations):
+        return self.client.post(reverse('task_batch', args=[self.project.id]),
+                                {'operations': json.dumps(operations)})
+
+    def order(self):
+        return list(Task.objects.filter(project=self.project).values_list("name", flat=True))
+
+    def test_operations_are_applied_in_order(self):
+        task0, task1, task2 = self.tasks
+        response = self.post_batch([{"op": "up", "task": task2.id}, {"op": "up", "task": task2.id},
+                                    {"op": "down", "task": task0.id}, {"op": "toggle", "task": task1.id}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.order(), ["Task 2", "Task 1", "Task 0"])
+        self.assertTrue(Task.objects.get(id=task1.id).status)
+        self.assertContains(response, "Task 2")
+
+    def test_batch_is_atomic(self):
+        other = Project.objects.create(name="Other", user=User.objects.create_user(username="other"))
+        foreign = Task.objects.create(name="Foreign", project=other, deadline=timezone.now())
+        response = self.post_batch([{"op": "up", "task": self.tasks[2].id}, {"op": "toggle", "task": foreign.id}])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.order(), ["Task 0", "Task 1", "Task 2"])
+        self.assertFalse(Task.objects.get(id=foreign.id).status)
+
+    def test_malformed_operations(self):
+        for operations in ["nope", [{"op": "sideways", "task": 1}], [{"op": "up"}], {"op": "up", "task": 1}]:
+            with self.subTest(operations=operations):
+                self.assertEqual(self.post_batch(operations).status_code, 400)
+
+
+class SingleFlightTest(TestCase):
+    def test_concurrent_calls_are_coalesced(self):
+        flights = SingleFlight()
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flights.do("key", slow)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(flights.do("key", slow))) for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join()
+        self.assertEqual(results, ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flights.flights, {})
+
+    def test_failed_call_is_not_shared(self):
+        flights = SingleFlight()
+        with self.assertRaises(ValueError):
+            flights.do("key", lambda: int("x"))
+        self.assertEqual(flights.do("key", lambda: 1), 1)
+
+    def test_requests_after_a_write_are_not_coalesced(self):
+        user = User.objects.create_user(username="testuser", password="testpassword")
+        versions = {"current": 1}
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        @coalesce_get(lambda request: versions["current"])
+        def view(request):
+            version = versions["current"]
+            calls.append(version)
+            started.set()
+            release.wait()
+            return HttpResponse(str(version))
+
+        def get():
+            request = RequestFactory().get("/tasks/")
+            request.user = user
+            results.append(view(request).content)
+
+        results = []
+        leader = threading.Thread(target=get)
+        leader.start()
+        started.wait()
+        joined = threading.Thread(target=get)
+        joined.start()
+        time.sleep(0.1)
+        versions["current"] = 2
+        after_write = threading.Thread(target=get)
+        after_write.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in [leader, joined, after_write]:
+            thread.join()
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(sorted(results), [b"1", b"1", b"2"])
+
+
+class TaskListStreamingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.project = Project.objects.create(name="Test Project", user=self.user)
+        for i in range(3):
+            Task.objects.create(name=f"Task {i}", project=self.project, deadline=timezone.now(), status=i == 1)
+
+    def test_streamed_list_matches_buffered_list(self):
+        url = reverse('task_list', args=[self.project.id])
+        buffered = self.client.get(url, {'stream': 0})
+        with CaptureQueriesContext(connection) as context:
+            streamed = self.client.get(url, {'stream': 1})
+            content = b"".join(streamed.streaming_content)
+        self.assertTrue(streamed.streaming)
+        self.assertHTMLEqual(content.decode(), buffered.content.decode())
+        task_query = next(query["sql"] for query in context.captured_queries
+                          if 'FROM "projects_task"' in query["sql"])
+        self.assertEqual(task_query.split(" FROM ")[0],
+                         "SELECT " + ", ".join(f'"projects_task"."{column}"' for column in TASK_LIST_FIELDS))
+
+    @override_settings(TASK_LIST_STREAMING=True)
+    def test_streaming_setting(self):
+        response = self.client.get(reverse('task_list', args=[self.project.id]))
+        self.assertTrue(response.streaming)
+        self.assertContains(response, "Task 2")
+
+
+class TaskListStreamingCursorTest(TransactionTestCase):
+    def test_rows_are_read_in_a_transaction(self):
+        user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        project = Project.objects.create(name="Test Project", user=user)
+        Task.objects.create(name="Task 1", project=project, deadline=timezone.now())
+        in_transaction = []
+
+        def record(execute, sql, params, many, context):
+            if 'FROM "projects_task"' in sql:
+                in_transaction.append(connection.in_atomic_block)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = self.client.get(reverse('task_list', args=[project.id]), {'stream': 1})
+            b"".join(response.streaming_content)
+        self.assertEqual(in_transaction, [True])
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.project = Project.objects.create(name="Test Project", user=self.user)
+        Task.objects.create(name="Task 1", project=self.project, deadline=timezone.now())
+
+    def test_metrics(self):
+        self.client.get(reverse('task_list', args=[self.project.id]))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn('task_manager_http_requests_total{method="GET",status="200",view="task_list"}', content)
+        self.assertIn('task_manager_http_request_duration_seconds_count{view="task_list"}', content)
+        self.assertIn('task_manager_db_queries_per_request_sum{view="task_list"}', content)
+        self.assertIn('task_manager_template_render_duration_seconds_count{view="task_list"}', content)
+        self.assertIn('task_manager_table_rows{table="projects_task"} 1.0', content)
+
+    def test_metrics_access(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR="203.0.113.5").status_code, 403)
+        with override_settings(METRICS_TOKEN="secret"):
+            self.assertEqual(self.client.get(url).status_code, 403)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+            response = self.client.get(url, REMOTE_ADDR="203.0.113.5", HTTP_AUTHORIZATION="Bearer secret")
+            self.assertEqual(response.status_code, 200)
+
+    def test_queries_during_render_are_not_template_time(self):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        self.addCleanup(current_stats.reset, token)
+        template = engines.all()[0].from_string("{% for task in tasks %}{{ task.name }}{% endfor %}")
+        with connection.execute_wrapper(stats):
+            with connection.execute_wrapper(lambda execute, *args: time.sleep(0.05) or execute(*args)):
+                template.render({"tasks": Task.objects.all()})
+        self.assertEqual(stats.queries, 1)
+        self.assertGreaterEqual(stats.db_time, 0.05)
+        self.assertLess(stats.template_time, 0.05)
+
+
+class TaskDependencyTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.project = Project.objects.create(name="Test Project", user=self.user)
+        self.tasks = [Task.objects.create(name=f"Task {i}", project=self.project, deadline=timezone.now())
+                      for i in range(5)]
+
+    def depend(self, task, prerequisite):
+        return self.client.post(reverse('task_dependency_add', args=[self.project.id, task.id]),
+                                {'depends_on': prerequisite.id})
+
+    def topo_order(self):
+        return dict(Task.objects.values_list("id", "topo_order"))
+
+    def unmet(self, task):
+        return Task.objects.get(id=task.id).unmet_dependencies
+
+    def test_add_dependency_reorders_affected_tasks_only(self):
+        task0, task1, task2, task3, task4 = self.tasks
+        self.assertEqual(self.depend(task1, task0).status_code, 200)
+        before = self.topo_order()
+        response = self.depend(task0, task3)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Blocked by 1")
+        order = self.topo_order()
+        self.assertLess(order[task3.id], order[task0.id])
+        self.assertLess(order[task0.id], order[task1.id])
+        self.assertEqual(order[task4.id], before[task4.id])
+        self.assertEqual(sorted(order.values()), sorted(before.values()))
+        self.assertEqual(self.unmet(task0), 1)
+
+    def test_cycle_is_rejected(self):
+        task0, task1, task2 = self.tasks[:3]
+        self.depend(task1, task0)
+        self.depend(task2, task1)
+        for task, prerequisite in [(task0, task2), (task0, task0), (task1, task0)]:
+            with self.subTest(task=task.name, prerequisite=prerequisite.name):
+                response = self.depend(task, prerequisite)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("depends_on", response.json()["errors"])
+        self.assertEqual(TaskDependency.objects.count(), 2)
+
+    def test_foreign_prerequisite_is_rejected(self):
+        other = Project.objects.create(name="Other", user=self.user)
+        foreign = Task.objects.create(name="Foreign", project=other, deadline=timezone.now())
+        self.assertEqual(self.depend(self.tasks[0], foreign).status_code, 400)
+
+    def test_random_links_keep_a_topological_order(self):
+        generator = random.Random(0)
+        links = set()
+        for _ in range(60):
+            task, prerequisite = generator.sample(self.tasks, 2)
+            response = self.depend(task, prerequisite)
+            waits = {task.id}
+            while True:
+                reached = waits | {waiting for waiting, required in links if required in waits}
+                if reached == waits:
+                    break
+                waits = reached
+            if prerequisite.id in waits or (task.id, prerequisite.id) in links:
+                self.assertEqual(response.status_code, 400)
+            else:
+                self.assertEqual(response.status_code, 200)
+                links.add((task.id, prerequisite.id))
+            order = self.topo_order()
+            self.assertTrue(all(order[required] < order[waiting] for waiting, required in links))
+
+    def test_deep_chain_is_searched_in_one_query_per_direction(self):
+        chain = Task.objects.bulk_create(
+            Task(name=f"Step {i}", project=self.project, deadline=timezone.now(), priority=100 + i, topo_order=100 + i)
+            for i in range(300))
+        TaskDependency.objects.bulk_create(
+            TaskDependency(task=task, depends_on=prerequisite) for prerequisite, task in zip(chain, chain[1:]))
+        first, last = chain[0], chain[-1]
+        prerequisite = Task.objects.create(name="Last", project=self.project, deadline=timezone.now())
+        with CaptureQueriesContext(connection) as queries:
+            add_dependency(first, prerequisite)
+        searches = [query for query in queries if "WITH RECURSIVE" in query["sql"]]
+        self.assertEqual(len(searches), 2)
+        order = self.topo_order()
+        self.assertLess(order[prerequisite.id], order[first.id])
+        self.assertTrue(all(order[a.id] < order[b.id] for a, b in zip(chain, chain[1:])))
+        with self.assertRaises(ValidationError):
+            add_dependency(first, Task.objects.get(id=last.id))
+
+    def test_counters_follow_status_and_ready_list(self):
+        task0, task1, task2 = self.tasks[:3]
+        self.depend(task2, task0)
+        self.depend(task2, task1)
+        self.assertEqual(self.unmet(task2), 2)
+        ready = self.client.get(reverse('task_ready_list', args=[self.project.id]))
+        self.assertNotContains(ready, "Task 2")
+        self.client.post(reverse('task_status_toggle', args=[self.project.id, task0.id]))
+        self.assertEqual(self.unmet(task2), 1)
+        update_status(Task.objects.filter(id__in=[task0.id, task1.id]), True)
+        self.assertEqual(self.unmet(task2), 0)
+        ready = self.client.get(reverse('task_ready_list', args=[self.project.id]))
+        self.assertContains(ready, "Task 2")
+        self.assertNotContains(ready, "Task 0")
+        update_status(Task.objects.filter(id=task1.id), False)
+        self.assertEqual(self.unmet(task2), 1)
+
+    def test_counters_use_the_committed_status(self):
+        task0, task1, task2 = self.tasks[:3]
+        stale = Task.objects.get(id=task0.id)
+        update_status(Task.objects.filter(id=task0.id), True)
+        add_dependency(task2, stale)
+        self.assertEqual(self.unmet(task2), 0)
+        self.depend(task2, task1)
+        update_status(Task.objects.filter(id__in=[task0.id, task1.id]), True)
+        update_status(Task.objects.filter(id__in=[task0.id, task1.id]), True)
+        self.assertEqual(self.unmet(task2), 0)
+
+    def test_remove_and_delete_release_waiting_tasks(self):
+        task0, task1, task2 = self.tasks[:3]
+        self.depend(task2, task0)
+        self.depend(task2, task1)
+        response = self.client.delete(reverse('task_dependency_remove', args=[self.project.id, task2.id, task0.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.unmet(task2), 1)
+        self.client.delete(reverse('task_delete', args=[self.project.id, task1.id]))
+        self.assertEqual(self.unmet(task2), 0)
+        response = self.client.delete(reverse('task_dependency_remove', args=[self.project.id, task2.id, task0.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_links_and_counters_reach_the_change_feed(self):
+        task0, task1 = self.tasks[:2]
+        feed = reverse('change_list')
+        cursor = self.client.get(feed).json()["cursor"]
+        self.depend(task1, task0)
+        data = self.client.get(feed, {'cursor': cursor}).json()
+        changes = {(c["model"], c["id"]): c for c in data["changes"]}
+        link = TaskDependency.objects.get()
+        self.assertEqual(changes[("dependency", link.id)]["data"],
+                         {"project": self.project.id, "task": task1.id, "depends_on": task0.id})
+        self.assertEqual(changes[("task", task1.id)]["data"]["unmet_dependencies"], 1)
+
+        self.client.post(reverse('task_status_toggle', args=[self.project.id, task0.id]))
+        data = self.client.get(feed, {'cursor': data["cursor"]}).json()
+        changes = {(c["model"], c["id"]): c for c in data["changes"]}
+        self.assertEqual(changes[("task", task1.id)]["data"]["unmet_dependencies"], 0)
+
+        self.client.delete(reverse('task_delete', args=[self.project.id, task0.id]))
+        data = self.client.get(feed, {'cursor': data["cursor"]}).json()
+        changes = {(c["model"], c["id"]): c for c in data["changes"]}
+        self.assertEqual(changes[("dependency", link.id)]["action"], "delete")
+
+    def test_plain_save_updates_counters(self):
+        task0, task1 = self.tasks[:2]
+        self.depend(task1, task0)
+        task0.status = True
+        task0.save()
+        self.assertEqual(self.unmet(task1), 0)
+        task0.name = "Renamed"
+        task0.save()
+        self.assertEqual(self.unmet(task1), 0)
+        task0.status = False
+        task0.save(update_fields=["status"])
+        self.assertEqual(self.unmet(task1), 1)
+
+    def test_new_task_is_last_in_topological_order(self):
+        self.depend(self.tasks[0], self.tasks[4])
+        task = Task.objects.create(name="Task 5", project=self.project, deadline=timezone.now())
+        self.assertEqual(task.topo_order, max(self.topo_order().values()))
+        self.assertEqual(len(set(self.topo_order().values())), 6)
+
+    def test_new_task_after_delete_gets_a_free_position(self):
+        self.depend(self.tasks[0], self.tasks[4])
+        self.tasks[4].delete()
+        task = Task.objects.create(name="Task 5", project=self.project, deadline=timezone.now())
+        order = self.topo_order()
+        self.assertEqual(task.topo_order, max(order.values()))
+        self.assertEqual(len(set(order.values())), len(order))
@@ -16,4 +16,14 @@ urlpatterns = [
          views.task_priority_down, name='task_priority_down'),
     path('project/<int:project_id>/task/<int:task_id>/status/toggle/',
          views.task_status_toggle, name='task_status_toggle'),
+    path('project/<int:project_id>/tasks/batch/', views.task_batch, name='task_batch'),
+    path('project/<int:project_id>/tasks/ready/', views.task_ready_list, name='task_ready_list'),
+    path('project/<int:project_id>/task/<int:task_id>/dependencies/',
+         views.task_dependency_add, name='task_dependency_add'),
+    path('project/<int:project_id>/task/<int:task_id>/dependencies/<int:depends_on_id>/',
+         views.task_dependency_remove, name='task_dependency_remove'),
+    path("changes/", views.change_list, name="change_list"),
+    path("metrics", views.metrics, name="metrics"),
+    path("profiles/", views.profile_list, name="profile_list"),
+    path("profiles/<str:name>.<str:extension>", views.profile_download, name="profile_download"),
 ]
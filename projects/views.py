@@ -1,12 +1,37 @@
+import hmac
+import json
+from itertools import islice
+from prometheus_client import CONTENT_TYPE_LATEST
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.shortcuts import get_object_or_404, render
-from django.http import HttpResponse, JsonResponse
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
+from django.template.loader import get_template, render_to_string
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST, require_http_methods
 from .models import Project, Task
-from .forms import ProjectForm, TaskForm
+from .forms import ProjectForm, TaskDependencyForm, TaskForm
+from .changes import FEED_PAGE_SIZE, changes_since, head_cursor
+from .coalescing import coalesce_get
+from .dependencies import add_dependency, ready_tasks, remove_dependency
+from .metrics import export
+from .profiling import list_profiles, profile_path
 # Create your views here.
 
+BATCH_OPERATIONS = {"up": "move_up", "down": "move_down", "toggle": "toggle_status"}
+MAX_BATCH_OPERATIONS = 100
+
+LOOPBACK_ADDRESSES = {"127.0.0.1", "::1"}
+
+# Columns of a task used by the task list template.
+TASK_LIST_FIELDS = ["id", "name", "status", "deadline", "unmet_dependencies"]
+STREAM_CHUNK_SIZE = 500
+
 
 def home(request) -> HttpResponse:
     """
@@ -112,11 +137,85 @@ def project_delete(request, project_id: int) -> HttpResponse:
     return render(request, "project_list.html", {"projects": projects})
 
 
+def task_list_streaming(request) -> bool:
+    """
+    Checks whether the task list should be streamed.
+
+    The "stream" query flag (1 or 0) overrides the TASK_LIST_STREAMING setting.
+
+    Args:
+    request (HttpRequest): HTTP request from the client.
+
+    Returns:
+    bool: True if the task list should be streamed.
+    """
+    if "stream" in request.GET:
+        return request.GET["stream"] == "1"
+    return settings.TASK_LIST_STREAMING
+
+
+def stream_task_rows(request, project: Project):
+    """
+    Renders the task list of a project chunk by chunk.
+
+    Only the columns the template uses are fetched, through a server-side cursor,
+    so memory use doesn't grow with the number of tasks.
+    The rows are read in a transaction: outside of one, the cursor is declared WITH HOLD
+    and PostgreSQL materializes the whole result before returning the first row.
+
+    Args:
+    request (HttpRequest): HTTP request from the client.
+    project (Project): The project to render the tasks of.
+
+    Yields:
+    str: Parts of the task list page.
+    """
+    # The same templates task_list.html includes, rendered one after another.
+    yield render_to_string("task_list_open.html", {"project": project}, request)
+    rows = get_template("task_rows.html")
+    with transaction.atomic():
+        tasks = Task.objects.filter(project=project).values(*TASK_LIST_FIELDS)
+        tasks = tasks.iterator(chunk_size=STREAM_CHUNK_SIZE)
+        while chunk := list(islice(tasks, STREAM_CHUNK_SIZE)):
+            yield rows.render({"tasks": chunk, "project": project}, request)
+    yield render_to_string("task_list_close.html", {"project": project}, request)
+
+
 @login_required
-def task_list(request, project_id: int) -> HttpResponse:
+def task_list(request, project_id: int) -> HttpResponse | StreamingHttpResponse:
     """
     Displays a list of tasks for the current user's specified project.
 
+    In streaming mode the rows are rendered and sent in chunks while they are read from the database.
+
+    Args:
+    request (HttpRequest): HTTP request from the client.
+    project_id (int): The ID of the project to display tasks for.
+
+    Returns:
+    HttpResponse: A page with a list of tasks for the project.
+    StreamingHttpResponse: The same page, sent in parts, in streaming mode.
+    """
+    if task_list_streaming(request):
+        project = get_object_or_404(Project, id=project_id, user=request.user)
+        return StreamingHttpResponse(stream_task_rows(request, project))
+    return render_task_list(request, project_id)
+
+
+def change_log_head(request) -> int:
+    """
+    Returns the head of the current user's change log, which advances with every committed write.
+    """
+    return head_cursor(request.user)
+
+
+@coalesce_get(change_log_head)
+def render_task_list(request, project_id: int) -> HttpResponse:
+    """
+    Renders the whole task list of the current user's project at once.
+
+    Concurrent identical requests share a single render, unless the user's data changed in between.
+
     Args:
     request (HttpRequest): HTTP request from the client.
     project_id (int): The ID of the project to display tasks for.
@@ -181,7 +280,10 @@ def task_update(request, project_id: int, task_id: int) -> HttpResponse | JsonRe
         return JsonResponse({"errors": form.errors}, status=400)
     else:
         form = TaskForm(instance=task)
-        return render(request, "task_item.html", {"form": form, "task": task, "project": project})
+        prerequisites = Task.objects.filter(dependent_links__task=task)
+        return render(request, "task_item.html", {
+            "form": form, "task": task, "project": project, "prerequisites": prerequisites,
+        })
 
 
 @login_required
@@ -206,6 +308,38 @@ def task_delete(request, project_id: int, task_id: int) -> HttpResponse:
     return render(request, "task_list.html", {"tasks": tasks, "project": project})
 
 
+def lock_project(request, project_id: int) -> Project:
+    """
+    Returns the current user's project and locks it until the end of the transaction.
+
+    Serializes concurrent reorder and toggle requests of the same project.
+
+    Args:
+    request (HttpRequest): HTTP request from the client.
+    project_id (int): ID of the project to lock.
+
+    Returns:
+    Project: The locked project.
+    """
+    return get_object_or_404(Project.objects.select_for_update(), id=project_id, user=request.user)
+
+
+def get_project_task(project: Project, task_id: int) -> Task:
+    """
+    Returns a task of the given project.
+
+    Args:
+    project (Project): The project the task belongs to.
+    task_id (int): ID of the task.
+
+    Returns:
+    Task: The task with the project already attached.
+    """
+    task = get_object_or_404(Task, id=task_id, project=project)
+    task.project = project
+    return task
+
+
 @login_required
 @csrf_exempt
 def task_priority_up(request, project_id: int, task_id: int) -> HttpResponse:
@@ -219,17 +353,10 @@ def task_priority_up(request, project_id: int, task_id: int) -> HttpResponse:
 
     Returns:
     HttpResponse: Page with the list of tasks for the project after the priority has been changed.
-    """""
-    project = get_object_or_404(Project, id=project_id, user=request.user)
-    task = get_object_or_404(Task, id=task_id, project=project)
-    prev_task = Task.objects.filter(
-        project=project, priority__lt=task.priority
-    ).order_by('-priority').first()
-
-    if prev_task:
-        task.priority, prev_task.priority = prev_task.priority, task.priority
-        task.save()
-        prev_task.save()
+    """
+    with transaction.atomic():
+        project = lock_project(request, project_id)
+        get_project_task(project, task_id).move_up()
     tasks = Task.objects.filter(project=project)
     return render(request, "task_list.html", {"tasks": tasks, "project": project})
 
@@ -248,16 +375,9 @@ def task_priority_down(request, project_id: int, task_id: int) -> HttpResponse:
     Returns:
     HttpResponse: Page with the list of tasks for the project after the priority has been changed.
     """
-    project = get_object_or_404(Project, id=project_id, user=request.user)
-    task = get_object_or_404(Task, id=task_id, project=project)
-    next_task = Task.objects.filter(
-        project=project, priority__gt=task.priority
-    ).order_by('priority').first()
-
-    if next_task:
-        task.priority, next_task.priority = next_task.priority, task.priority
-        task.save()
-        next_task.save()
+    with transaction.atomic():
+        project = lock_project(request, project_id)
+        get_project_task(project, task_id).move_down()
     tasks = Task.objects.filter(project=project)
     return render(request, "task_list.html", {"tasks": tasks, "project": project})
 
@@ -276,8 +396,212 @@ def task_status_toggle(request, project_id: int, task_id: int) -> HttpResponse:
     Returns:
     HttpResponse: Page with the list of tasks for the project after the task status was changed.
     """
-    task = get_object_or_404(Task, id=task_id, project__id=project_id)
-    task.status = not task.status
-    task.save()
-    tasks = Task.objects.filter(project=task.project)
-    return render(request, "task_list.html", {"tasks": tasks, "project": task.project})
+    with transaction.atomic():
+        project = lock_project(request, project_id)
+        get_project_task(project, task_id).toggle_status()
+    tasks = Task.objects.filter(project=project)
+    return render(request, "task_list.html", {"tasks": tasks, "project": project})
+
+
+@login_required
+@require_POST
+@csrf_exempt
+def task_batch(request, project_id: int) -> HttpResponse | JsonResponse:
+    """
+    Applies a batch of reorder and toggle operations to the tasks of the current user's project.
+
+    The operations are passed as a JSON list in the "operations" form field, e.g.
+    [{"op": "up", "task": 1}, {"op": "toggle", "task": 2}]. Supported operations are
+    "up", "down" and "toggle". They are applied in order in a single transaction:
+    if one of them fails, none is applied.
+
+    Args:
+    request (HttpRequest): HTTP request with the operations.
+    project_id (int): ID of the project the tasks belong to.
+
+    Returns:
+    JsonResponse: Error response if the operations are malformed.
+    HttpResponse: Page with the list of tasks for the project after all operations were applied.
+    """
+    try:
+        operations = json.loads(request.POST.get("operations", ""))
+        operations = [(BATCH_OPERATIONS[operation["op"]], int(operation["task"])) for operation in operations]
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({"errors": {"operations": ["Enter a list of operations."]}}, status=400)
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return JsonResponse({"errors": {"operations": [
+            f"Ensure there are at most {MAX_BATCH_OPERATIONS} operations."
+        ]}}, status=400)
+
+    with transaction.atomic():
+        project = lock_project(request, project_id)
+        for method, task_id in operations:
+            getattr(get_project_task(project, task_id), method)()
+    tasks = Task.objects.filter(project=project)
+    return render(request, "task_list.html", {"tasks": tasks, "project": project})
+
+
+@login_required
+def task_ready_list(request, project_id: int) -> HttpResponse:
+    """
+    Displays the not completed tasks of the current user's project whose prerequisites are all completed.
+
+    Args:
+    request (HttpRequest): HTTP request from the client.
+    project_id (int): The ID of the project to display tasks for.
+
+    Returns:
+    HttpResponse: A page with the list of ready tasks.
+    """
+    project = get_object_or_404(Project, id=project_id, user=request.user)
+    return render(request, "task_list.html", {"tasks": ready_tasks(project), "project": project})
+
+
+@login_required
+@require_POST
+@csrf_exempt
+def task_dependency_add(request, project_id: int, task_id: int) -> HttpResponse | JsonResponse:
+    """
+    Makes a task of the current user's project wait until another task of the project is completed.
+
+    Args:
+    request (HttpRequest): HTTP request with the "depends_on" task ID.
+    project_id (int): ID of the project the tasks belong to.
+    task_id (int): ID of the task that will wait.
+
+    Returns:
+    JsonResponse: Error response if the prerequisite is invalid or the link would create a cycle.
+    HttpResponse: Page with the list of tasks for the project after the link was added.
+    """
+    with transaction.atomic():
+        project = lock_project(request, project_id)
+        task = get_project_task(project, task_id)
+        form = TaskDependencyForm(request.POST, project=project)
+        if form.is_valid():
+            try:
+                add_dependency(task, form.cleaned_data["depends_on"])
+            except ValidationError as error:
+                form.add_error("depends_on", error)
+        if form.errors:
+            return JsonResponse({"errors": form.errors}, status=400)
+    tasks = Task.objects.filter(project=project)
+    return render(request, "task_list.html", {"tasks": tasks, "project": project})
+
+
+@login_required
+@require_http_methods(["DELETE"])
+@csrf_exempt
+def task_dependency_remove(request, project_id: int, task_id: int, depends_on_id: int) -> HttpResponse:
+    """
+    Removes a prerequisite of a task of the current user's project.
+
+    Args:
+    request (HttpRequest): HTTP request to delete.
+    project_id (int): ID of the project the tasks belong to.
+    task_id (int): ID of the waiting task.
+    depends_on_id (int): ID of the prerequisite to remove.
+
+    Returns:
+    HttpResponse: Page with the list of tasks for the project after the link was removed.
+    """
+    with transaction.atomic():
+        project = lock_project(request, project_id)
+        task = get_project_task(project, task_id)
+        if not remove_dependency(task, get_project_task(project, depends_on_id)):
+            raise Http404("No such dependency.")
+    tasks = Task.objects.filter(project=project)
+    return render(request, "task_list.html", {"tasks": tasks, "project": project})
+
+
+@login_required
+def change_list(request) -> JsonResponse:
+    """
+    Returns the current user's changes recorded after the given cursor.
+
+    Query parameters:
+    cursor (int): ID of the last change the client has applied, 0 for a new client.
+    limit (int): Maximum number of log entries to read.
+
+    Args:
+    request (HttpRequest): HTTP request from the client.
+
+    Returns:
+    JsonResponse: The new cursor and the collapsed changes since the given cursor.
+    JsonResponse: Response with status 410 and the current cursor if the client must refetch everything.
+    """
+    try:
+        cursor = int(request.GET.get("cursor", 0))
+        limit = min(int(request.GET.get("limit", FEED_PAGE_SIZE)), FEED_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"errors": {"cursor": ["Enter a whole number."]}}, status=400)
+    feed = changes_since(request.user, cursor, max(limit, 1))
+    if feed is None:
+        return JsonResponse({"resync": True, "cursor": head_cursor(request.user)}, status=410)
+    return JsonResponse(feed)
+
+
+@staff_member_required
+def profile_list(request) -> HttpResponse:
+    """
+    Displays the captured request profiles, newest first.
+
+    Args:
+    request (HttpRequest): HTTP request from the client.
+
+    Returns:
+    HttpResponse: Page with the list of profiles.
+    """
+    return render(request, "profile_list.html", {"profiles": list_profiles()})
+
+
+@staff_member_required
+def profile_download(request, name: str, extension: str) -> FileResponse:
+    """
+    Returns a file of a captured profile.
+
+    Args:
+    request (HttpRequest): HTTP request from the client.
+    name (str): Name of the profile.
+    extension (str): "folded" for the collapsed stacks or "json" for the request details and SQL timings.
+
+    Returns:
+    FileResponse: The requested file.
+    """
+    path = profile_path(name, extension)
+    if path is None:
+        raise Http404("Profile not found")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
+
+
+def metrics_allowed(request) -> bool:
+    """
+    Checks whether a request may read the metrics.
+
+    With METRICS_TOKEN set the request has to send it as a bearer token,
+    otherwise only requests from the same host are allowed.
+
+    Args:
+    request (HttpRequest): HTTP request from the client.
+
+    Returns:
+    bool: True if the metrics may be returned.
+    """
+    if settings.METRICS_TOKEN:
+        return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}")
+    return request.META.get("REMOTE_ADDR") in LOOPBACK_ADDRESSES
+
+
+def metrics(request) -> HttpResponse:
+    """
+    Returns the application metrics in the Prometheus text format.
+
+    Args:
+    request (HttpRequest): HTTP request from the client.
+
+    Returns:
+    HttpResponse: Request, database and template metrics of all workers and the table sizes.
+    HttpResponseForbidden: The request has no valid metrics token.
+    """
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(export(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,83 @@
+"""
+Measures the cold start of the application server.
+
+Starts the server, polls the URL until it answers with 200 and reports the time to the first
+successful request. Then sends a request to every worker and compares the first request a worker
+serves with the following ones. The per-worker numbers come from the gunicorn log lines written
+by the post_request hook in gunicorn.conf.py.
+
+Usage:
+    python scripts/measure_startup.py [--url URL] [--requests N] [-- server command]
+
+The default server command is "gunicorn".
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+FIRST_REQUEST = re.compile(r"First request of worker (\d+): \S+ \S+ took ([\d.]+) ms")
+
+
+def fetch(url: str) -> float | None:
+    """
+    Requests the URL and returns the duration in milliseconds, or None if it failed.
+    """
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            response.read()
+            if response.status != 200:
+                return None
+    except (urllib.error.URLError, ConnectionError):
+        return None
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000/")
+    parser.add_argument("--requests", type=int, default=50, help="Number of requests after the first success.")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for the first success.")
+    parser.add_argument("command", nargs="*", default=["gunicorn"])
+    args = parser.parse_args()
+
+    log = []
+    started = time.perf_counter()
+    server = subprocess.Popen(args.command, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
+    reader = threading.Thread(target=lambda: log.extend(server.stderr), daemon=True)
+    reader.start()
+    try:
+        first = None
+        while first is None:
+            if time.perf_counter() - started > args.timeout or server.poll() is not None:
+                sys.exit("The server did not answer with 200:\n" + "".join(log))
+            first = fetch(args.url)
+            if first is None:
+                time.sleep(0.05)
+        ready = (time.perf_counter() - started) * 1000
+
+        durations = [fetch(args.url) for _ in range(args.requests)]
+        durations = [duration for duration in durations if duration is not None]
+    finally:
+        server.terminate()
+        server.wait()
+        reader.join(timeout=5)
+
+    print(f"Time to first successful request: {ready:.1f} ms")
+    print(f"First request: {first:.1f} ms")
+    if durations:
+        print(f"Following {len(durations)} requests: median {statistics.median(durations):.1f} ms, "
+              f"max {max(durations):.1f} ms")
+    workers = [(pid, float(ms)) for line in log for pid, ms in FIRST_REQUEST.findall(line)]
+    for pid, ms in workers:
+        print(f"First request of worker {pid}: {ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
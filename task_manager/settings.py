@@ -28,9 +28,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'True') == 'True'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.getenv('ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -55,11 +55,14 @@ AUTHENTICATION_BACKENDS = (
 )
 
 MIDDLEWARE = [
+    'projects.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'projects.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -69,7 +72,7 @@ ROOT_URLCONF = 'task_manager.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'projects.metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,7 +95,11 @@ WSGI_APPLICATION = 'task_manager.wsgi.application'
 DATABASE_URL = os.getenv('DATABASE_URL')
 
 DATABASES = {
-    'default': dj_database_url.config(default=DATABASE_URL)
+    'default': dj_database_url.config(
+        default=DATABASE_URL,
+        conn_max_age=int(os.getenv('CONN_MAX_AGE', 0)),
+        conn_health_checks=True,
+    )
 }
 
 
@@ -131,6 +138,7 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -144,3 +152,24 @@ ACCOUNT_AUTHENTICATED_REDIRECT_URL = '/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 ACCOUNT_EMAIL_REQUIRED = True
+
+# Task lists are rendered and sent in chunks when streaming is on,
+# a request can override it with ?stream=1 or ?stream=0.
+
+TASK_LIST_STREAMING = os.getenv('TASK_LIST_STREAMING', 'False') == 'True'
+
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>" when the token is set,
+# and is only served to requests from the same host otherwise.
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Request profiling
+# Staff users profile a request with ?profile=1 or the X-Profile header,
+# PROFILING_SAMPLE_RATE=N additionally profiles one in N requests.
+# Only the newest PROFILING_MAX_PROFILES profiles are kept.
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_SAMPLE_RATE = int(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_MAX_PROFILES = int(os.getenv('PROFILING_MAX_PROFILES', 500))
+PROFILING_INTERVAL = 0.001